@@ -2,26 +2,68 @@
 AWS Strands Agent Client
 Handles all communication with the AWS Strands Agent runtime
 """
+import asyncio
 import boto3
+import codecs
 import json
 import os
-from typing import Dict, Any, Optional
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Any, Iterator, Optional
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .stub_backend import StubAgentRuntime
+
 class StrandsAgentClient:
     def __init__(self):
         """Initialize the Strands Agent client with AWS credentials"""
         self.aws_region = os.getenv('AWS_REGION', 'us-east-1')
         self.agent_id = os.getenv('AWS_STRANDS_AGENT_ID')
         self.agent_alias_id = os.getenv('AWS_STRANDS_AGENT_ALIAS_ID', 'TSTALIASID')
+        self.max_concurrency = int(os.getenv('AGENT_MAX_CONCURRENCY', '8'))
+        
+        # Agent calls get their own small pool so slow generations never
+        # occupy the request threadpool that serves the data endpoints
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='strands-agent')
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        
+        self.backend = os.getenv('AGENT_BACKEND', 'bedrock').lower()
+        
+        # Fail fast while the runtime is erroring instead of tying up workers
+        self.circuit_breaker = CircuitBreaker(
+            failure_rate_threshold=float(os.getenv('AGENT_CIRCUIT_FAILURE_RATE', '0.5')),
+            window_size=int(os.getenv('AGENT_CIRCUIT_WINDOW', '20')),
+            minimum_calls=int(os.getenv('AGENT_CIRCUIT_MIN_CALLS', '5')),
+            reset_timeout=float(os.getenv('AGENT_CIRCUIT_RESET_SECONDS', '30'))
+        )
         
-        # Initialize boto3 client for Bedrock Agent Runtime
+        if self.backend == 'stub':
+            # Local stub that streams canned chunks, for load tests without network access
+            self.client = StubAgentRuntime()
+            self.agent_id = self.agent_id or 'local-stub-agent'
+            return
+        
+        # Initialize boto3 client for Bedrock Agent Runtime with a connection pool
+        # sized for the agent executor, bounded timeouts and adaptive retries
+        client_config = Config(
+            max_pool_connections=int(os.getenv('AGENT_MAX_POOL_CONNECTIONS', str(max(10, self.max_concurrency)))),
+            connect_timeout=float(os.getenv('AGENT_CONNECT_TIMEOUT_SECONDS', '5')),
+            read_timeout=float(os.getenv('AGENT_READ_TIMEOUT_SECONDS', '60')),
+            retries={
+                'mode': 'adaptive',
+                'total_max_attempts': int(os.getenv('AGENT_MAX_ATTEMPTS', '3'))
+            }
+        )
         try:
             self.client = boto3.client(
                 'bedrock-agent-runtime',
                 region_name=self.aws_region,
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                config=client_config
             )
         except Exception as e:
             print(f"Warning: Could not initialize AWS client: {e}")
@@ -50,24 +92,10 @@ class StrandsAgentClient:
         try:
             # Generate session ID if not provided
             if not session_id:
-                import uuid
                 session_id = str(uuid.uuid4())
             
-            # Invoke the agent
-            response = self.client.invoke_agent(
-                agentId=self.agent_id,
-                agentAliasId=self.agent_alias_id,
-                sessionId=session_id,
-                inputText=prompt
-            )
-            
-            # Process the streaming response
-            completion_text = ""
-            for event in response.get('completion', []):
-                if 'chunk' in event:
-                    chunk = event['chunk']
-                    if 'bytes' in chunk:
-                        completion_text += chunk['bytes'].decode('utf-8')
+            # Collect the streamed chunks and join once, rather than growing a string per chunk
+            completion_text = "".join(self.stream_agent(prompt, session_id))
             
             return {
                 "success": True,
@@ -76,6 +104,13 @@ class StrandsAgentClient:
                 "agent_id": self.agent_id
             }
             
+        except CircuitOpenError as e:
+            # Degraded response while the circuit is open; no call was made
+            return {
+                "success": False,
+                "error": str(e),
+                "insights": "Agent temporarily unavailable due to repeated failures. Showing data without AI insights."
+            }
         except ClientError as e:
             error_message = str(e)
             print(f"AWS Strands Agent error: {error_message}")
@@ -93,6 +128,117 @@ class StrandsAgentClient:
                 "insights": f"Unexpected error: {error_message}"
             }
     
+    def stream_agent(self, prompt: str, session_id: str) -> Iterator[str]:
+        """
+        Invoke the agent and yield the completion text chunk by chunk as it arrives
+        
+        Chunks are decoded incrementally, so a multi-byte UTF-8 character split
+        across two chunks is still decoded correctly. Outcomes feed the
+        circuit breaker; AWS errors, and CircuitOpenError while the circuit is
+        open, propagate to the caller.
+        
+        Args:
+            prompt: The formatted prompt to send to the agent
+            session_id: Session ID for maintaining conversation context
+            
+        Yields:
+            Decoded completion text fragments
+        """
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError("Agent circuit breaker is open")
+        try:
+            response = self.client.invoke_agent(
+                agentId=self.agent_id,
+                agentAliasId=self.agent_alias_id,
+                sessionId=session_id,
+                inputText=prompt
+            )
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            for event in response.get('completion', []):
+                chunk = event.get('chunk')
+                if chunk and 'bytes' in chunk:
+                    text = decoder.decode(chunk['bytes'])
+                    if text:
+                        yield text
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+        except GeneratorExit:
+            # Consumer stopped reading; says nothing about the runtime's health
+            self.circuit_breaker.record_success()
+            raise
+        except Exception:
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+    
+    async def stream_agent_async(self, prompt: str, session_id: str) -> AsyncIterator[str]:
+        """
+        Async counterpart of stream_agent that runs the blocking boto3 stream
+        on the agent executor and hands chunks back to the event loop
+        
+        Counts against the same concurrency limit as invoke_agent_async. If
+        the consumer stops iterating, the worker stops reading at the next chunk.
+        
+        Args:
+            prompt: The formatted prompt to send to the agent
+            session_id: Session ID for maintaining conversation context
+            
+        Yields:
+            Decoded completion text fragments
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            stop = threading.Event()
+            finished = object()
+            
+            def pump():
+                try:
+                    for text in self.stream_agent(prompt, session_id):
+                        if stop.is_set():
+                            break
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+                    loop.call_soon_threadsafe(queue.put_nowait, finished)
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, e)
+            
+            worker = loop.run_in_executor(self._executor, pump)
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is finished:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                stop.set()
+                await asyncio.shield(worker)
+    
+    async def invoke_agent_async(self, prompt: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Invoke the agent without blocking the event loop
+        
+        At most max_concurrency calls run at once; further callers wait on a
+        semaphore (and can be cancelled while waiting) instead of queueing
+        inside the executor.
+        
+        Args:
+            prompt: The formatted prompt to send to the agent
+            session_id: Optional session ID for maintaining conversation context
+            
+        Returns:
+            Dict containing the agent's response and metadata
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.invoke_agent, prompt, session_id)
+    
     def is_configured(self) -> bool:
         """Check if the agent client is properly configured"""
         return self.client is not None and self.agent_id is not None
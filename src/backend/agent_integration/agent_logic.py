@@ -2,17 +2,150 @@
 Agent Logic Module
 Defines how backend data is converted into agent prompts and processes responses
 """
-from typing import Dict, Any, List
+from collections import Counter
+from typing import Callable, Dict, Any, Iterable, List, Optional
+import heapq
 import json
+import os
+
+from .recommendations import Recommendation, RecommendationParser
+
+# Default prompt size limit, in estimated tokens
+DEFAULT_TOKEN_BUDGET = int(os.getenv('AGENT_PROMPT_TOKEN_BUDGET', '6000'))
+
+# Rough characters-per-token ratio used for budgeting
+CHARS_PER_TOKEN = 4
+
+SEVERITY_RANK = {"Critical": 0, "High": 1, "Warning": 2, "Medium": 3, "Low": 4, "Info": 5}
 
 class AgentLogic:
     @staticmethod
-    def format_alerts_prompt(alerts: List[Dict[str, Any]]) -> str:
+    def estimate_tokens(text: str) -> int:
+        """Estimate the token count of a prompt fragment"""
+        return -(-len(text) // CHARS_PER_TOKEN)
+    
+    @staticmethod
+    def _compact(data: Any) -> str:
+        return json.dumps(data, separators=(",", ":"), default=str)
+    
+    @staticmethod
+    def _build_prompt(template: str, records: List[Dict[str, Any]], rank_key: Callable[[Dict[str, Any]], Any],
+                      summarize: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+                      token_budget: Optional[int], context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Fill a prompt template with as many top-ranked records as fit the budget
+        
+        Records are ranked with rank_key (smallest first) and added in compact
+        JSON until the token budget is used up. Records that do not fit are
+        represented by summarize() aggregates, so the prompt stays bounded
+        however large the input grows. The context counts against the same
+        budget and is trimmed first if it would not fit on its own.
+        
+        Args:
+            template: Prompt text with a {data} placeholder
+            records: Records to include, already projected to prompt fields
+            rank_key: Sort key; records with the smallest keys are included first
+            summarize: Builds aggregate counts and totals for a list of records
+            token_budget: Maximum prompt size in estimated tokens
+            context: Extra data included alongside the records, trimmed to fit the budget
+            
+        Returns:
+            Formatted prompt string
+        """
+        budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+        summary = {"total_records": len(records), **summarize(records)}
+        # Reserve room for the summary of omitted records and its bookkeeping keys
+        reserved = len(AgentLogic._compact({"summary": summary, "records": []})) + len(AgentLogic._compact(summary)) + 64
+        available = (budget - AgentLogic.estimate_tokens(template)) * CHARS_PER_TOKEN - reserved
+        context = AgentLogic._fit_context(context or {}, available)
+        payload = {**context, "summary": summary, "records": []}
+        remaining = available - (len(AgentLogic._compact(payload)) - len(AgentLogic._compact({"summary": summary, "records": []})))
+        
+        # No record is shorter than a few dozen characters, which bounds how many can fit
+        candidates = heapq.nsmallest(max(remaining // 32, 0), records, key=rank_key) if remaining > 0 else []
+        included = []
+        for record in candidates:
+            size = len(AgentLogic._compact(record)) + 1
+            if size > remaining:
+                break
+            included.append(record)
+            remaining -= size
+        
+        payload["records"] = included
+        if len(included) < len(records):
+            included_ids = {id(record) for record in included}
+            omitted = [record for record in records if id(record) not in included_ids]
+            summary["included_records"] = len(included)
+            summary["omitted_records"] = {"count": len(omitted), **summarize(omitted)}
+        return template.format(data=AgentLogic._compact(payload))
+    
+    @staticmethod
+    def _fit_context(context: Dict[str, Any], max_chars: int) -> Dict[str, Any]:
+        """
+        Shrink a prompt context until its compact JSON fits max_chars: list
+        entries lose items from the end, other entries are replaced by null,
+        largest entries first
+        """
+        fitted = dict(context)
+        overflow = len(AgentLogic._compact(fitted)) - max(max_chars, 0)
+        for key in sorted(fitted, key=lambda k: -len(AgentLogic._compact(fitted[k]))):
+            if overflow <= 0:
+                break
+            value = fitted[key]
+            if isinstance(value, list):
+                kept = list(value)
+                while kept and overflow > 0:
+                    overflow -= len(AgentLogic._compact(kept.pop())) + 1
+                fitted[key] = kept
+            elif value is not None:
+                overflow -= len(AgentLogic._compact(value)) - len("null")
+                fitted[key] = None
+        return fitted
+    
+    @staticmethod
+    def _summarize_alerts(alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "by_severity": dict(Counter(a.get("severity") for a in alerts)),
+            "by_source": dict(Counter(a.get("source") for a in alerts))
+        }
+    
+    @staticmethod
+    def _summarize_resources(resources: List[Dict[str, Any]]) -> Dict[str, Any]:
+        cost_by_region: Counter = Counter()
+        cost_by_type: Counter = Counter()
+        for resource in resources:
+            cost = resource.get("monthly_cost") or 0
+            cost_by_region[resource.get("region")] += cost
+            cost_by_type[resource.get("type")] += cost
+        return {
+            "total_monthly_cost": round(sum(cost_by_region.values()), 2),
+            "monthly_cost_by_region": {k: round(v, 2) for k, v in cost_by_region.items()},
+            "monthly_cost_by_type": {k: round(v, 2) for k, v in cost_by_type.items()},
+            "by_status": dict(Counter(r.get("status") for r in resources))
+        }
+    
+    @staticmethod
+    def _summarize_findings(findings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "by_severity": dict(Counter(f.get("severity") for f in findings)),
+            "by_compliance": dict(Counter(c for f in findings for c in f.get("compliance", [])))
+        }
+    
+    @staticmethod
+    def _summarize_savings(items: List[Dict[str, Any]], field: str) -> Dict[str, Any]:
+        return {
+            f"total_{field}": sum(item.get(field) or 0 for item in items),
+            "by_status": dict(Counter(item.get("status") for item in items))
+        }
+    
+    @staticmethod
+    def format_alerts_prompt(alerts: List[Dict[str, Any]], token_budget: Optional[int] = None) -> str:
         """
         Convert alerts data into a structured prompt for the agent
         
         Args:
             alerts: List of alert dictionaries
+            token_budget: Maximum prompt size in estimated tokens
             
         Returns:
             Formatted prompt string
@@ -25,29 +158,36 @@ class AgentLogic:
                 "severity": alert.get("severity"),
                 "source": alert.get("source"),
                 "message": alert.get("message"),
-                "resources": alert.get("affected_resources", [])
+                "resources": alert.get("affected_resources", []),
+                "count": alert.get("count", 1)
             })
         
-        prompt = f"""Analyze the following cloud infrastructure alerts and provide:
+        template = """Analyze the following cloud infrastructure alerts and provide:
 1. Severity classification and priority ranking
 2. Quick action summary for each alert
 3. Potential root causes
 4. Recommended immediate actions
 
-Alerts data:
-{json.dumps(alert_summary, indent=2)}
+Alerts data (most severe first; "summary" aggregates every alert, including any omitted for length):
+{data}
 
 Provide a structured analysis with clear recommendations."""
         
-        return prompt
+        return AgentLogic._build_prompt(
+            template, alert_summary,
+            rank_key=lambda a: (SEVERITY_RANK.get(a["severity"], len(SEVERITY_RANK)), -a["count"]),
+            summarize=AgentLogic._summarize_alerts,
+            token_budget=token_budget
+        )
     
     @staticmethod
-    def format_resources_prompt(resources: List[Dict[str, Any]]) -> str:
+    def format_resources_prompt(resources: List[Dict[str, Any]], token_budget: Optional[int] = None) -> str:
         """
         Convert resources data into a structured prompt for the agent
         
         Args:
             resources: List of resource dictionaries
+            token_budget: Maximum prompt size in estimated tokens
             
         Returns:
             Formatted prompt string
@@ -64,26 +204,32 @@ Provide a structured analysis with clear recommendations."""
                 "region": resource.get("region")
             })
         
-        prompt = f"""Analyze the following cloud resources and provide:
+        template = """Analyze the following cloud resources and provide:
 1. Cost-saving opportunities and rightsizing recommendations
 2. Utilization analysis and optimization strategies
 3. Regional optimization suggestions
 4. Estimated cost savings for each recommendation
 
-Resources data:
-{json.dumps(resource_summary, indent=2)}
+Resources data (most expensive first; "summary" aggregates every resource, including any omitted for length):
+{data}
 
 Provide specific, actionable recommendations with estimated cost impact."""
         
-        return prompt
+        return AgentLogic._build_prompt(
+            template, resource_summary,
+            rank_key=lambda r: -(r["monthly_cost"] or 0),
+            summarize=AgentLogic._summarize_resources,
+            token_budget=token_budget
+        )
     
     @staticmethod
-    def format_security_prompt(findings: List[Dict[str, Any]]) -> str:
+    def format_security_prompt(findings: List[Dict[str, Any]], token_budget: Optional[int] = None) -> str:
         """
         Convert security findings into a structured prompt for the agent
         
         Args:
             findings: List of security finding dictionaries
+            token_budget: Maximum prompt size in estimated tokens
             
         Returns:
             Formatted prompt string
@@ -99,75 +245,154 @@ Provide specific, actionable recommendations with estimated cost impact."""
                 "resource": finding.get("resource")
             })
         
-        prompt = f"""Analyze the following security findings and provide:
+        template = """Analyze the following security findings and provide:
 1. Risk impact assessment for each finding
 2. Compliance mapping (SOC2, ISO 27001, GDPR)
 3. Prioritization based on risk severity and business impact
 4. Remediation steps and estimated effort
 
-Security findings:
-{json.dumps(findings_summary, indent=2)}
+Security findings (most severe first; "summary" aggregates every finding, including any omitted for length):
+{data}
 
 Provide a comprehensive security analysis with clear remediation roadmap."""
         
-        return prompt
+        return AgentLogic._build_prompt(
+            template, findings_summary,
+            rank_key=lambda f: SEVERITY_RANK.get(f["severity"], len(SEVERITY_RANK)),
+            summarize=AgentLogic._summarize_findings,
+            token_budget=token_budget
+        )
     
     @staticmethod
-    def format_optimization_prompt(data: Dict[str, Any]) -> str:
+    def format_optimization_prompt(data: Dict[str, Any], token_budget: Optional[int] = None) -> str:
         """
         Convert optimization data into a structured prompt for the agent
         
         Args:
             data: Optimization data dictionary
+            token_budget: Maximum prompt size in estimated tokens
             
         Returns:
             Formatted prompt string
         """
-        prompt = f"""Analyze the following cloud optimization opportunities and provide:
+        template = """Analyze the following cloud optimization opportunities and provide:
 1. Multi-factor recommendations combining cost, performance, and sustainability
 2. Priority ranking based on potential impact
 3. Implementation complexity assessment
 4. Expected ROI and timeline
 
-Optimization data:
-{json.dumps(data, indent=2)}
+Optimization data (recommendations by estimated savings; "summary" aggregates all of them):
+{data}
 
 Provide a strategic optimization roadmap with clear action items."""
         
-        return prompt
+        return AgentLogic._build_prompt(
+            template, data.get("recommendations", []),
+            rank_key=lambda r: -(r.get("estimated_savings") or 0),
+            summarize=lambda items: AgentLogic._summarize_savings(items, "estimated_savings"),
+            token_budget=token_budget,
+            context={"config": data.get("config"), "projections": data.get("projections")}
+        )
     
     @staticmethod
-    def format_overview_prompt(data: Dict[str, Any]) -> str:
+    def format_overview_prompt(data: Dict[str, Any], token_budget: Optional[int] = None) -> str:
         """
         Convert overview data into a structured prompt for the agent
         
         Args:
             data: Overview data dictionary with savings, activities, and recommendations
+            token_budget: Maximum prompt size in estimated tokens
             
         Returns:
             Formatted prompt string
         """
-        prompt = f"""Analyze the following cloud infrastructure overview data and provide:
+        template = """Analyze the following cloud infrastructure overview data and provide:
 1. Key insights about cost savings trends
 2. Activity pattern analysis
 3. Top priority recommendations
 4. Overall infrastructure health assessment
 
-Overview data:
-{json.dumps(data, indent=2)}
+Overview data (recommendations by estimated savings; "summary" aggregates all of them):
+{data}
 
 Provide a comprehensive analysis with actionable insights."""
         
-        return prompt
+        return AgentLogic._build_prompt(
+            template, data.get("recommendations", []),
+            rank_key=lambda r: -(r.get("estimatedSavings") or 0),
+            summarize=lambda items: AgentLogic._summarize_savings(items, "estimatedSavings"),
+            token_budget=token_budget,
+            context={"savingsData": data.get("savingsData"), "activities": data.get("activities", [])[:20]}
+        )
+    
+    @staticmethod
+    def section_records(section: str, data: Any) -> Dict[str, Any]:
+        """
+        Key a section's data by record id, for computing what changed between prompts
+        
+        Args:
+            section: Data type (overview, alerts, resources, security, optimization)
+            data: The same data passed to the section's format_*_prompt
+            
+        Returns:
+            Dict of record id to record
+        """
+        if section in ("alerts", "resources", "security"):
+            return {record["id"]: record for record in data}
+        if section == "optimization":
+            records = {"config": data.get("config"), "projections": data.get("projections")}
+            records.update({f"recommendation:{r['id']}": r for r in data.get("recommendations", [])})
+            return records
+        records = {"savingsData": data.get("savingsData")}
+        records.update({f"activity:{a['id']}": a for a in data.get("activities", [])})
+        records.update({f"recommendation:{r['id']}": r for r in data.get("recommendations", [])})
+        return records
     
     @staticmethod
-    def process_agent_response(response: Dict[str, Any], data_type: str) -> Dict[str, Any]:
+    def format_delta_prompt(section: str, delta: Dict[str, List[Any]], token_budget: Optional[int] = None) -> str:
+        """
+        Build a follow-up prompt carrying only what changed since the previous
+        prompt in the same agent session
+        
+        Args:
+            section: Data type the session is about
+            delta: Output of sessions.compute_delta with added/changed records and removed ids
+            token_budget: Maximum prompt size in estimated tokens
+            
+        Returns:
+            Formatted prompt string
+        """
+        changes = [{"change": "added", "record": r} for r in delta["added"]]
+        changes += [{"change": "changed", "record": r} for r in delta["changed"]]
+        
+        template = f"""The {section} data you analyzed earlier in this conversation has changed.
+Only the differences since your last analysis are listed below; everything else is unchanged.
+
+Changes:
+{{data}}
+
+Update your previous analysis and recommendations to reflect these changes, keeping the same structure."""
+        
+        return AgentLogic._build_prompt(
+            template, changes,
+            rank_key=lambda c: c["change"] != "added",
+            summarize=lambda items: {"by_change": dict(Counter(c["change"] for c in items))},
+            token_budget=token_budget,
+            context={"removed_count": len(delta["removed"]), "removed_ids": delta["removed"][:200]}
+        )
+    
+    @staticmethod
+    def process_agent_response(response: Dict[str, Any], data_type: str,
+                               recommendations: Optional[List[Recommendation]] = None,
+                               known_ids: Iterable[str] = ()) -> Dict[str, Any]:
         """
         Process and structure the agent's response based on data type
         
         Args:
             response: Raw response from the agent
             data_type: Type of data (alerts, resources, security, optimization)
+            recommendations: Recommendations already parsed while the response streamed in
+            known_ids: Resource ids to recognize in recommendation text
             
         Returns:
             Structured response dictionary
@@ -181,6 +406,8 @@ Provide a comprehensive analysis with actionable insights."""
         
         # Extract insights from the response
         insights = response.get("insights", "")
+        if recommendations is None:
+            recommendations = AgentLogic._extract_recommendations(insights, known_ids)
         
         # Structure the response based on data type
         structured_response = {
@@ -188,33 +415,25 @@ Provide a comprehensive analysis with actionable insights."""
             "insights": insights,
             "data_type": data_type,
             "session_id": response.get("session_id"),
-            "recommendations": AgentLogic._extract_recommendations(insights)
+            "recommendations": [r.text for r in recommendations],
+            "recommendation_details": [r.to_dict() for r in recommendations]
         }
         
         return structured_response
     
     @staticmethod
-    def _extract_recommendations(insights_text: str) -> List[str]:
+    def _extract_recommendations(insights_text: str, known_ids: Iterable[str] = ()) -> List[Recommendation]:
         """
         Extract key recommendations from the insights text
         
         Args:
             insights_text: The full insights text from the agent
+            known_ids: Resource ids to recognize in recommendation text
             
         Returns:
-            List of key recommendations
-        """
-        # Simple extraction - look for numbered lists or bullet points
-        recommendations = []
-        lines = insights_text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            # Look for numbered items or bullet points
-            if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                # Clean up the line
-                cleaned = line.lstrip('0123456789.-•) ').strip()
-                if cleaned and len(cleaned) > 10:  # Avoid very short lines
-                    recommendations.append(cleaned)
-        
-        return recommendations[:10]  # Return top 10 recommendations
+            Up to 10 recommendations from numbered items or bullet points
+        """
+        parser = RecommendationParser(known_ids)
+        parser.feed(insights_text)
+        parser.close()
+        return parser.recommendations
@@ -0,0 +1,86 @@
+"""
+Agent Insight Cache
+Content-addressed cache of processed agent responses keyed by prompt hash
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class InsightCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached responses before the least
+                recently used one is evicted
+            ttl_seconds: How long a cached response stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float, Dict[str, Any]]]" = OrderedDict()
+        self._sections: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(prompt: str) -> str:
+        """Return the content address of a prompt"""
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            section, expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, section: str, value: Dict[str, Any]) -> None:
+        """Cache a processed response for a section, evicting the LRU entry when full"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (section, time.monotonic() + self.ttl_seconds, value)
+            self._sections.setdefault(section, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, section: str) -> int:
+        """Drop every cached response for a section; returns how many were removed"""
+        with self._lock:
+            keys = self._sections.pop(section, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _remove(self, key: str) -> None:
+        section, _, _ = self._entries.pop(key)
+        keys = self._sections.get(section)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._sections[section]
@@ -0,0 +1,93 @@
+"""
+Circuit Breaker
+Fails agent calls fast while the agent runtime is erroring, then probes for recovery
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate_threshold: float = 0.5, window_size: int = 20,
+                 minimum_calls: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker
+
+        Args:
+            failure_rate_threshold: Failure ratio over the window that opens the circuit
+            window_size: Number of most recent calls the failure rate is computed over
+            minimum_calls: Calls required in the window before the circuit may open
+            reset_timeout: Seconds the circuit stays open before a trial call is let through
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed; in half-open state only one trial call is allowed"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._current_state() == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._trial_in_flight = False
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            if self._current_state() == self.HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= self.minimum_calls
+                    and failures / len(self._outcomes) >= self.failure_rate_threshold):
+                self._trip()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current state and failure counts in the window"""
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "recent_calls": len(self._outcomes),
+                "recent_failures": self._outcomes.count(False)
+            }
+
+    def _trip(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
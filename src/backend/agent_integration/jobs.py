@@ -0,0 +1,87 @@
+"""
+Agent Job Manager
+Runs agent invocations in the background and tracks them by job id
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Dict, Optional
+
+
+class JobLimitExceeded(Exception):
+    """Raised when too many agent jobs are already pending"""
+
+
+class AgentJobManager:
+    def __init__(self, max_pending: int = 100, retention_seconds: float = 3600):
+        """
+        Initialize the job manager
+
+        Args:
+            max_pending: Maximum number of jobs that may be pending or running at once
+            retention_seconds: How long finished jobs stay available for polling
+        """
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, section: str, work: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Schedule an agent invocation on the running event loop
+
+        Args:
+            section: Dashboard section the job produces insights for
+            work: Awaitable producing the processed agent response
+
+        Returns:
+            The job record, including its id
+        """
+        self._prune()
+        if len(self._tasks) >= self.max_pending:
+            if asyncio.iscoroutine(work):
+                work.close()
+            raise JobLimitExceeded(f"Too many pending agent jobs (limit {self.max_pending})")
+
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "section": section,
+            "status": "pending",
+            "created_at": time.time(),
+            "completed_at": None,
+            "result": None,
+            "error": None
+        }
+        self._jobs[job_id] = job
+        self._tasks[job_id] = asyncio.ensure_future(self._run(job, work))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record by id, or None if unknown or expired"""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: Dict[str, Any], work: Awaitable[Dict[str, Any]]) -> None:
+        job["status"] = "running"
+        try:
+            job["result"] = await work
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["completed_at"] = time.time()
+            self._tasks.pop(job["job_id"], None)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["completed_at"] is not None and job["completed_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
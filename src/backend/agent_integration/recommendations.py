@@ -0,0 +1,135 @@
+"""
+Recommendation Parser
+Extracts structured recommendations from agent output, line by line as it streams in
+"""
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+# Numbered or bulleted lines shorter than this are treated as headings, not recommendations
+MIN_RECOMMENDATION_LENGTH = 10
+
+BULLET_PREFIX = re.compile(r"^(?:\d+[.)]?|[-•*])\s*")
+MARKDOWN_EMPHASIS = re.compile(r"\*\*|__|`")
+
+AMOUNT = r"\$\s?(\d[\d,]*(?:\.\d+)?)\s*(?:([kKmM])(?![A-Za-z]))?"
+SAVINGS_AFTER_KEYWORD = re.compile(r"sav(?:e|es|ing|ings)\b[^$\n]{0,40}?" + AMOUNT, re.IGNORECASE)
+SAVINGS_BEFORE_KEYWORD = re.compile(AMOUNT + r"(?:\s*/\s*\w+)?(?:\s+(?:in|of|per\s+\w+))?(?:\s+\w+)?\s+sav", re.IGNORECASE)
+AMOUNT_MULTIPLIERS = {"k": 1_000, "m": 1_000_000}
+
+PRIORITY_LABELLED = re.compile(r"priority\s*[:=-]?\s*(critical|high|medium|low)\b", re.IGNORECASE)
+PRIORITY_QUALIFIED = re.compile(r"\b(critical|high|medium|low)[\s-]+priority\b", re.IGNORECASE)
+PRIORITY_LEADING = re.compile(r"^(critical|high|medium|low)\s*[:-]", re.IGNORECASE)
+
+# AWS-style resource identifiers that are recognized even when not in the inventory
+AWS_RESOURCE_ID = re.compile(
+    r"\b(?:arn:aws[\w-]*:[^\s,;)]+"
+    r"|(?:i|vol|snap|sg|subnet|vpc|ami|eni|igw|nat|rtb|eipalloc)-[0-9a-f]{8,17})\b"
+)
+TOKEN = re.compile(r"[A-Za-z0-9][\w.:/-]*[A-Za-z0-9]|[A-Za-z0-9]")
+
+
+@dataclass
+class Recommendation:
+    text: str
+    estimated_savings: Optional[float] = None
+    resource_ids: List[str] = field(default_factory=list)
+    priority: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_recommendation(line: str, known_ids: Iterable[str] = ()) -> Optional[Recommendation]:
+    """
+    Parse a single line of agent output into a recommendation
+
+    Args:
+        line: One line of the agent's response
+        known_ids: Resource ids to look for in the text, in addition to AWS-style ids
+
+    Returns:
+        The recommendation, or None if the line is not a numbered or bulleted item
+    """
+    line = line.strip()
+    if not line or not (line[0].isdigit() or line[0] in "-•*"):
+        return None
+    text = BULLET_PREFIX.sub("", line, count=1).strip()
+    if len(text) <= MIN_RECOMMENDATION_LENGTH:
+        return None
+
+    plain = MARKDOWN_EMPHASIS.sub("", text)
+    return Recommendation(
+        text=text,
+        estimated_savings=_parse_savings(plain),
+        resource_ids=_parse_resource_ids(plain, known_ids),
+        priority=_parse_priority(plain)
+    )
+
+
+class RecommendationParser:
+    def __init__(self, known_ids: Iterable[str] = (), limit: int = 10):
+        """
+        Initialize the parser
+
+        Args:
+            known_ids: Resource ids to look for in recommendation text
+            limit: Maximum number of recommendations to emit
+        """
+        self.known_ids = frozenset(known_ids)
+        self.limit = limit
+        self.recommendations: List[Recommendation] = []
+        self._pending = ""
+
+    def feed(self, chunk: str) -> List[Recommendation]:
+        """
+        Consume a chunk of streamed text
+
+        Returns:
+            Recommendations whose lines were completed by this chunk
+        """
+        if "\n" not in chunk:
+            self._pending += chunk
+            return []
+        lines = (self._pending + chunk).split("\n")
+        self._pending = lines.pop()
+        return self._parse_lines(lines)
+
+    def close(self) -> List[Recommendation]:
+        """Flush the final unterminated line, returning any recommendation it holds"""
+        pending, self._pending = self._pending, ""
+        return self._parse_lines([pending])
+
+    def _parse_lines(self, lines: List[str]) -> List[Recommendation]:
+        emitted = []
+        for line in lines:
+            if len(self.recommendations) >= self.limit:
+                break
+            recommendation = parse_recommendation(line, self.known_ids)
+            if recommendation is not None:
+                self.recommendations.append(recommendation)
+                emitted.append(recommendation)
+        return emitted
+
+
+def _parse_savings(text: str) -> Optional[float]:
+    match = SAVINGS_AFTER_KEYWORD.search(text) or SAVINGS_BEFORE_KEYWORD.search(text)
+    if match is None:
+        return None
+    amount = float(match.group(1).replace(",", ""))
+    suffix = match.group(2)
+    return amount * AMOUNT_MULTIPLIERS[suffix.lower()] if suffix else amount
+
+
+def _parse_resource_ids(text: str, known_ids: Iterable[str]) -> List[str]:
+    found = dict.fromkeys(AWS_RESOURCE_ID.findall(text))
+    if known_ids:
+        for token in TOKEN.findall(text):
+            if token in known_ids:
+                found[token] = None
+    return list(found)
+
+
+def _parse_priority(text: str) -> Optional[str]:
+    match = PRIORITY_LABELLED.search(text) or PRIORITY_QUALIFIED.search(text) or PRIORITY_LEADING.search(text)
+    return match.group(1).capitalize() if match else None
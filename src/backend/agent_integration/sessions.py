@@ -0,0 +1,103 @@
+"""
+Agent Session Registry
+Keeps one agent conversation per user and section, and remembers what data
+was last sent so follow-up prompts only carry the changes
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def fingerprint_record(record: Any) -> str:
+    """Return a stable content hash of a record"""
+    encoded = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def snapshot_records(records: Dict[str, Any]) -> Dict[str, str]:
+    """Return record id -> content hash for a set of records"""
+    return {record_id: fingerprint_record(record) for record_id, record in records.items()}
+
+
+def compute_delta(previous: Dict[str, str], current: Dict[str, str], records: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Compare the current records against the snapshot sent previously
+
+    Args:
+        previous: Record id -> content hash from the last prompt
+        current: Record id -> content hash of the current records
+        records: Record id -> current record
+
+    Returns:
+        Dict with "added" and "changed" records and "removed" ids
+    """
+    added, changed = [], []
+    for record_id, digest in current.items():
+        before = previous.get(record_id)
+        if before is None:
+            added.append(records[record_id])
+        elif before != digest:
+            changed.append(records[record_id])
+    removed = [record_id for record_id in previous if record_id not in current]
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+class AgentSession:
+    def __init__(self, user_id: str, section: str):
+        self.user_id = user_id
+        self.section = section
+        self.session_id = str(uuid.uuid4())
+        self.snapshot: Dict[str, str] = {}
+        self.last_response: Optional[Dict[str, Any]] = None
+        self.last_used = time.monotonic()
+        self.turns = 0
+        self.lock = asyncio.Lock()
+
+    def commit(self, snapshot: Dict[str, str], response: Dict[str, Any]) -> None:
+        """Record that the agent has now seen the records in this snapshot"""
+        self.snapshot = snapshot
+        self.last_response = response
+        self.turns += 1
+        self.last_used = time.monotonic()
+
+
+class AgentSessionRegistry:
+    def __init__(self, idle_ttl_seconds: float = 1800, max_sessions: int = 10000):
+        """
+        Initialize the registry
+
+        Args:
+            idle_ttl_seconds: Idle time after which a session is discarded and the
+                next call starts a fresh conversation with the full dataset; keep
+                this below the agent's own idle session timeout
+            max_sessions: Maximum number of live sessions; the least recently
+                used one is dropped beyond this
+        """
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: Dict[Tuple[str, str], AgentSession] = {}
+
+    def get(self, user_id: str, section: str) -> AgentSession:
+        """Return the live session for a user and section, starting a new one if needed"""
+        key = (user_id, section)
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None or now - session.last_used > self.idle_ttl_seconds:
+                session = AgentSession(user_id, section)
+                self._sessions[key] = session
+                if len(self._sessions) > self.max_sessions:
+                    oldest = min(self._sessions, key=lambda k: self._sessions[k].last_used)
+                    del self._sessions[oldest]
+            session.last_used = now
+            return session
+
+    def reset(self, user_id: str, section: str) -> None:
+        """Forget a session so the next call resends the full dataset"""
+        with self._lock:
+            self._sessions.pop((user_id, section), None)
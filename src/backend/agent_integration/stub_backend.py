@@ -0,0 +1,81 @@
+"""
+Local Stub Agent Runtime
+Drop-in replacement for the bedrock-agent-runtime client that streams canned
+completions with configurable latency, for load-testing without network access
+"""
+import os
+import random
+import time
+from typing import Any, Dict, Iterator
+
+from botocore.exceptions import ClientError
+
+CANNED_COMPLETIONS = {
+    "alerts": [
+        "Priority ranking of active alerts:\n",
+        "1. Critical: restrict public access on prod-data-storage immediately (Priority: Critical)\n",
+        "2. Stop idle instance i-0123456789abcdef to save an estimated $62/month (Priority: High)\n",
+        "3. Right-size prod-mysql-01 after reviewing peak load (Priority: Medium)\n",
+    ],
+    "resources": [
+        "Cost-saving opportunities:\n",
+        "1. Right-size i-0123456789 from t3.medium to t3.small, estimated savings $30/month\n",
+        "2. Move cold objects in backup-bucket to archive storage, estimated savings $18/month\n",
+        "3. Review prod-db utilization before purchasing reserved capacity\n",
+    ],
+    "security": [
+        "Security risk assessment:\n",
+        "1. Remove public access from prod-db (SOC 2, GDPR) - Priority: Critical\n",
+        "2. Enable encryption at rest on backup-bucket (HIPAA) - Priority: High\n",
+        "3. Apply least privilege to dev-user-1 (PCI DSS) - Priority: High\n",
+    ],
+    "default": [
+        "Optimization roadmap:\n",
+        "1. Apply pending idle-resource and right-sizing recommendations first for the largest savings\n",
+        "2. Enable scheduling for dev/test resources outside business hours\n",
+        "3. Track savings weekly and revisit auto-scaling thresholds\n",
+    ],
+}
+
+
+class StubAgentRuntime:
+    def __init__(self, first_chunk_latency: float = None, chunk_latency: float = None,
+                 failure_rate: float = None):
+        """
+        Initialize the stub runtime
+
+        Args:
+            first_chunk_latency: Seconds before the first chunk (AGENT_STUB_FIRST_CHUNK_MS)
+            chunk_latency: Seconds between subsequent chunks (AGENT_STUB_CHUNK_MS)
+            failure_rate: Fraction of calls that raise a throttling error (AGENT_STUB_FAILURE_RATE)
+        """
+        self.first_chunk_latency = (first_chunk_latency if first_chunk_latency is not None
+                                    else float(os.getenv('AGENT_STUB_FIRST_CHUNK_MS', '300')) / 1000)
+        self.chunk_latency = (chunk_latency if chunk_latency is not None
+                              else float(os.getenv('AGENT_STUB_CHUNK_MS', '50')) / 1000)
+        self.failure_rate = (failure_rate if failure_rate is not None
+                             else float(os.getenv('AGENT_STUB_FAILURE_RATE', '0')))
+
+    def invoke_agent(self, agentId: str, agentAliasId: str, sessionId: str, inputText: str) -> Dict[str, Any]:
+        """Mirror bedrock-agent-runtime invoke_agent, returning a lazily streamed completion"""
+        if random.random() < self.failure_rate:
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Stub agent throttled"}},
+                "InvokeAgent"
+            )
+        return {"completion": self._stream(self._pick_completion(inputText)), "sessionId": sessionId}
+
+    def _stream(self, parts) -> Iterator[Dict[str, Any]]:
+        time.sleep(self.first_chunk_latency)
+        for index, part in enumerate(parts):
+            if index:
+                time.sleep(self.chunk_latency)
+            yield {"chunk": {"bytes": part.encode("utf-8")}}
+
+    @staticmethod
+    def _pick_completion(prompt: str):
+        opening = prompt[:200].lower()
+        for section in ("alerts", "resources", "security"):
+            if section in opening:
+                return CANNED_COMPLETIONS[section]
+        return CANNED_COMPLETIONS["default"]
@@ -1,5 +1,9 @@
-from datetime import datetime
-from typing import List, Dict, Any
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+from store import IndexedStore
 
 mock_alerts: List[Dict[str, Any]] = [
     {
@@ -34,23 +38,179 @@ mock_alerts: List[Dict[str, Any]] = [
     },
 ]
 
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+def fingerprint_alert(alert: Dict[str, Any]) -> str:
+    """Identity of an alert for deduplication: its title, source and affected resources"""
+    key = json.dumps(
+        [alert.get("title"), alert.get("source"), sorted(alert.get("affected_resources") or [])],
+        separators=(",", ":")
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def _with_occurrence_fields(alert: Dict[str, Any]) -> Dict[str, Any]:
+    alert.setdefault("fingerprint", fingerprint_alert(alert))
+    alert.setdefault("count", 1)
+    alert.setdefault("first_seen", alert["timestamp"])
+    alert.setdefault("last_seen", alert["timestamp"])
+    return alert
+
+alert_store = IndexedStore(
+    [_with_occurrence_fields(alert) for alert in mock_alerts],
+    indexes=("severity", "source", "status", "fingerprint"),
+    sorted_indexes=("timestamp",)
+)
+
+def normalize_timestamp(value: str) -> str:
+    """
+    Convert an ISO-8601 timestamp to the UTC second-precision form alerts are indexed by.
+    Raises ValueError for anything that is not an ISO-8601 string.
+    """
+    if not isinstance(value, str):
+        raise ValueError("Timestamp must be an ISO-8601 string")
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
 def get_all_alerts():
-    return mock_alerts
+    return alert_store.all()
+
+def query_alerts(severity: Optional[str] = None, source: Optional[str] = None,
+                 status: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Return alerts matching the given fields, optionally limited to a
+    [since, until] timestamp window. Windowed results are newest first.
+    Raises ValueError for timestamps that are not ISO-8601.
+    """
+    since = normalize_timestamp(since) if since else None
+    until = normalize_timestamp(until) if until else None
+    criteria = {"severity": severity, "source": source, "status": status}
+    with alert_store.lock:
+        if since is None and until is None:
+            return alert_store.find(**criteria)
+        if any(value is not None for value in criteria.values()):
+            matches = [a for a in alert_store.find(**criteria)
+                       if (since is None or a["timestamp"] >= since) and (until is None or a["timestamp"] <= until)]
+            return sorted(matches, key=lambda a: (a["timestamp"], a["id"]), reverse=True)
+        window = alert_store.sorted_index("timestamp").range(since, until)
+        return [alert_store.get(alert_id) for _, alert_id in reversed(list(window))]
+
+def get_recent_alerts(minutes: int, **criteria: Optional[str]) -> List[Dict[str, Any]]:
+    """Return alerts raised in the last given number of minutes"""
+    since = (datetime.now(timezone.utc) - timedelta(minutes=minutes)).strftime(TIMESTAMP_FORMAT)
+    return query_alerts(since=since, **criteria)
 
 def get_alert_by_id(alert_id: str):
-    return next((alert for alert in mock_alerts if alert["id"] == alert_id), None)
+    return alert_store.get(alert_id)
+
+def _normalize_updates(updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize any timestamp fields in an alert update; raises ValueError for non-ISO-8601 values"""
+    return {
+        field: normalize_timestamp(value) if field in ("timestamp", "first_seen", "last_seen") else value
+        for field, value in updates.items()
+    }
 
 def update_alert(alert_id: str, updates: Dict[str, Any]):
-    for alert in mock_alerts:
-        if alert["id"] == alert_id:
-            alert.update(updates)
-            return alert
-    return None
+    """Update an alert; raises ValueError for timestamps that are not ISO-8601"""
+    return alert_store.update(alert_id, _normalize_updates(updates))
+
+def update_alerts(alert_ids: List[str], updates: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply the same updates to many alerts in one locked pass, with a result per id"""
+    updates = _normalize_updates(updates)
+    return [
+        {"id": alert_id, "success": True, "alert": alert} if alert
+        else {"id": alert_id, "success": False, "error": "Alert not found"}
+        for alert_id, alert in alert_store.update_many(alert_ids, updates)
+    ]
 
 def delete_alert(alert_id: str):
-    global mock_alerts
-    alert = get_alert_by_id(alert_id)
-    if alert:
-        mock_alerts = [a for a in mock_alerts if a["id"] != alert_id]
-        return alert
+    return alert_store.delete(alert_id)
+
+def _invalid_alert_field(raw: Dict[str, Any]) -> Optional[str]:
+    """Describe the first field of a raw alert with the wrong type, or return None"""
+    for field in ("title", "source", "severity", "message"):
+        if field in raw and not isinstance(raw[field], str):
+            return f"'{field}' must be a string"
+    affected = raw.get("affected_resources")
+    if affected is not None and (not isinstance(affected, list)
+                                 or not all(isinstance(resource, str) for resource in affected)):
+        return "'affected_resources' must be a list of strings"
     return None
+
+def ingest_alerts(batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Ingest a batch of raw alerts, coalescing duplicates by fingerprint
+
+    Alerts sharing a fingerprint are first merged within the batch, then
+    folded into the matching active alert if one exists (incrementing its
+    count and widening first_seen/last_seen) or stored as a new alert.
+    The whole batch is applied under a single store lock.
+    """
+    rejected = []
+    merged: Dict[str, Dict[str, Any]] = {}
+    for position, raw in enumerate(batch):
+        if not isinstance(raw, dict) or not raw.get("title") or not raw.get("source"):
+            rejected.append({"index": position, "error": "Alert requires 'title' and 'source'"})
+            continue
+        try:
+            timestamp = normalize_timestamp(raw["timestamp"]) if raw.get("timestamp") else \
+                datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+            occurrences = max(1, int(raw.get("count", 1)))
+        except (TypeError, ValueError):
+            rejected.append({"index": position, "error": "Invalid 'timestamp' or 'count'"})
+            continue
+        error = _invalid_alert_field(raw)
+        if error:
+            rejected.append({"index": position, "error": error})
+            continue
+        alert = {
+            "title": raw["title"],
+            "message": raw.get("message", ""),
+            "severity": raw.get("severity", "Warning"),
+            "source": raw["source"],
+            "affected_resources": list(raw.get("affected_resources") or []),
+            "status": "active",
+        }
+        fingerprint = fingerprint_alert(alert)
+        existing = merged.get(fingerprint)
+        if existing is None:
+            merged[fingerprint] = dict(alert, fingerprint=fingerprint, count=occurrences,
+                                       first_seen=timestamp, last_seen=timestamp)
+        else:
+            existing["count"] += occurrences
+            existing["first_seen"] = min(existing["first_seen"], timestamp)
+            if timestamp >= existing["last_seen"]:
+                existing.update(last_seen=timestamp, message=alert["message"], severity=alert["severity"])
+
+    created, coalesced = [], []
+    with alert_store.lock:
+        for fingerprint, incoming in merged.items():
+            current = next(iter(alert_store.find(fingerprint=fingerprint, status="active")), None)
+            if current is None:
+                incoming["id"] = f"alert-{uuid.uuid4().hex[:12]}"
+                incoming["timestamp"] = incoming["last_seen"]
+                alert_store.insert(incoming)
+                created.append(incoming["id"])
+                continue
+            updates = {
+                "count": current.get("count", 1) + incoming["count"],
+                "first_seen": min(current.get("first_seen", current["timestamp"]), incoming["first_seen"]),
+            }
+            if incoming["last_seen"] >= current.get("last_seen", current["timestamp"]):
+                updates.update(
+                    last_seen=incoming["last_seen"],
+                    timestamp=incoming["last_seen"],
+                    message=incoming["message"],
+                    severity=incoming["severity"]
+                )
+            alert_store.update(current["id"], updates)
+            coalesced.append(current["id"])
+
+    return {
+        "received": len(batch),
+        "created": created,
+        "coalesced": coalesced,
+        "rejected": rejected
+    }
@@ -0,0 +1,218 @@
+"""
+Columnar cost and utilization analytics over the resource inventory
+"""
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import resources
+
+GROUP_DIMENSIONS = ("region", "provider", "type")
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+
+class _Categories:
+    """Maps categorical string values to dense integer codes"""
+
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.labels: List[Any] = []
+
+    def code(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.labels)
+            self.codes[value] = code
+            self.labels.append(value)
+        return code
+
+
+def _number(value: Any, default: float) -> float:
+    """value as a float, or default when it is missing or not a number"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return default
+
+
+class ResourceColumns:
+    """
+    Resource metrics held as parallel NumPy arrays, one row per resource.
+
+    Rows are kept in sync with an IndexedStore through its change listener,
+    so aggregations never have to walk the resource dicts. Deleted rows are
+    masked out and reused by later inserts. Summaries are memoized until the
+    next change to the columns.
+    """
+
+    def __init__(self, store, initial_capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._size = 0
+        self._version = 0
+        self._summaries: Dict[Any, Dict[str, Any]] = {}
+        self._categories = {dimension: _Categories() for dimension in GROUP_DIMENSIONS}
+        self._allocate(max(initial_capacity, len(store)))
+        with store.lock:
+            for record in store.all():
+                self._write_row(record)
+            store.subscribe(self._on_change)
+
+    def _allocate(self, capacity: int) -> None:
+        self._cost = np.zeros(capacity, dtype=np.float64)
+        self._utilization = np.full(capacity, np.nan, dtype=np.float32)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._codes = {dimension: np.zeros(capacity, dtype=np.int32) for dimension in GROUP_DIMENSIONS}
+
+    def _grow(self) -> None:
+        capacity = len(self._cost) * 2
+        old_cost, old_utilization, old_valid, old_codes = self._cost, self._utilization, self._valid, self._codes
+        self._allocate(capacity)
+        self._cost[:len(old_cost)] = old_cost
+        self._utilization[:len(old_utilization)] = old_utilization
+        self._valid[:len(old_valid)] = old_valid
+        for dimension in GROUP_DIMENSIONS:
+            self._codes[dimension][:len(old_codes[dimension])] = old_codes[dimension]
+
+    def _on_change(self, action: str, record: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+        if action == "update" and all(
+            previous.get(field) == record.get(field) for field in ("monthly_cost", "utilization", *GROUP_DIMENSIONS)
+        ):
+            return
+        with self._lock:
+            self._version += 1
+            self._summaries.clear()
+            if action == "delete":
+                row = self._rows.pop(record["id"], None)
+                if row is not None:
+                    self._valid[row] = False
+                    self._free_rows.append(row)
+            else:
+                self._write_row(record)
+
+    def _write_row(self, record: Dict[str, Any]) -> None:
+        row = self._rows.get(record["id"])
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                if self._size == len(self._cost):
+                    self._grow()
+                row = self._size
+                self._size += 1
+            self._rows[record["id"]] = row
+        self._cost[row] = _number(record.get("monthly_cost"), 0.0)
+        self._utilization[row] = _number(record.get("utilization"), np.nan)
+        self._valid[row] = True
+        for dimension in GROUP_DIMENSIONS:
+            self._codes[dimension][row] = self._categories[dimension].code(record.get(dimension))
+
+    @property
+    def version(self) -> int:
+        """Counter bumped on every change to the columns"""
+        return self._version
+
+    def snapshot(self, dimension: str = "type") -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, List[Any]]:
+        """
+        Return (version, cost, utilization, codes, labels) for the live rows,
+        where codes index labels for the given dimension. Arrays are copies.
+        """
+        with self._lock:
+            size = self._size
+            columns = [self._cost[:size], self._utilization[:size], self._codes[dimension][:size]]
+            if self._free_rows:
+                valid = self._valid[:size]
+                columns = [column[valid] for column in columns]
+            else:
+                columns = [column.copy() for column in columns]
+            return (self._version, *columns, list(self._categories[dimension].labels))
+
+    def summarize(self, group_by: Sequence[str] = GROUP_DIMENSIONS, idle_threshold: float = 5.0,
+                  percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """
+        Compute fleet totals, utilization percentiles and per-group cost,
+        idle spend and average utilization in one vectorized pass
+        """
+        for dimension in group_by:
+            if dimension not in GROUP_DIMENSIONS:
+                raise ValueError(f"Cannot group by '{dimension}'. Use any of: {', '.join(GROUP_DIMENSIONS)}")
+
+        cache_key = (tuple(group_by), idle_threshold, tuple(percentiles))
+        with self._lock:
+            cached = self._summaries.get(cache_key)
+            if cached is not None:
+                return cached
+            version = self._version
+            size = self._size
+            columns = [self._cost[:size], self._utilization[:size]]
+            columns += [self._codes[dimension][:size] for dimension in group_by]
+            if self._free_rows:
+                # Only pay for a masked copy when deleted rows are present
+                valid = self._valid[:size]
+                columns = [column[valid] for column in columns]
+            else:
+                columns = [column.copy() for column in columns]
+            labels = [list(self._categories[dimension].labels) for dimension in group_by]
+        cost, utilization, codes = columns[0], columns[1], columns[2:]
+
+        has_utilization = ~np.isnan(utilization)
+        idle = utilization < idle_threshold
+        idle_cost = cost * idle
+
+        groups = []
+        if codes:
+            sizes = [len(dimension_labels) for dimension_labels in labels]
+            group_key = codes[0].astype(np.int64)
+            for dimension_codes, dimension_size in zip(codes[1:], sizes[1:]):
+                group_key *= dimension_size
+                group_key += dimension_codes
+            slots = int(np.prod(sizes))
+            counts = np.bincount(group_key, minlength=slots)
+            cost_totals = np.bincount(group_key, weights=cost, minlength=slots)
+            idle_totals = np.bincount(group_key, weights=idle_cost, minlength=slots)
+            utilization_sums = np.bincount(group_key, weights=np.nan_to_num(utilization), minlength=slots)
+            utilization_counts = np.bincount(group_key[has_utilization], minlength=slots)
+
+            for slot in np.flatnonzero(counts):
+                coordinates = np.unravel_index(slot, sizes)
+                group = {dimension: labels[i][coordinates[i]] for i, dimension in enumerate(group_by)}
+                group.update({
+                    "resource_count": int(counts[slot]),
+                    "monthly_cost": round(float(cost_totals[slot]), 2),
+                    "idle_cost": round(float(idle_totals[slot]), 2),
+                    "avg_utilization": (round(float(utilization_sums[slot] / utilization_counts[slot]), 2)
+                                        if utilization_counts[slot] else None)
+                })
+                groups.append(group)
+            groups.sort(key=lambda g: g["monthly_cost"], reverse=True)
+
+        if has_utilization.any():
+            values = np.percentile(utilization[has_utilization], percentiles)
+            utilization_percentiles = {f"p{p:g}": round(float(v), 2) for p, v in zip(percentiles, values)}
+        else:
+            utilization_percentiles = {f"p{p:g}": None for p in percentiles}
+
+        summary = {
+            "totals": {
+                "resource_count": int(len(cost)),
+                "monthly_cost": round(float(cost.sum()), 2),
+                "idle_cost": round(float(idle_cost.sum()), 2),
+                "idle_resources": int(idle.sum())
+            },
+            "utilization_percentiles": utilization_percentiles,
+            "idle_threshold": idle_threshold,
+            "group_by": list(group_by),
+            "groups": groups
+        }
+        with self._lock:
+            if self._version == version:
+                self._summaries[cache_key] = summary
+        return summary
+
+
+resource_columns = ResourceColumns(resources.resource_store)
+
+def get_resource_analytics(group_by: Sequence[str] = GROUP_DIMENSIONS, idle_threshold: float = 5.0):
+    """Return aggregated cost and utilization analytics for the resource inventory"""
+    return resource_columns.summarize(group_by=group_by, idle_threshold=idle_threshold)
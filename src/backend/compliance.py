@@ -0,0 +1,71 @@
+"""
+Compliance framework coverage derived from security findings
+"""
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+# Response key for each framework named in a finding's compliance list
+FRAMEWORK_KEYS = {
+    "SOC 2": "soc2",
+    "ISO 27001": "iso27001",
+    "GDPR": "gdpr",
+    "HIPAA": "hipaa",
+    "CIS Benchmark": "cisBenchmark",
+    "PCI DSS": "pciDss"
+}
+
+# Remediation credit per finding status, in half points so totals stay exact integers
+STATUS_CREDIT = {"Fixed": 2, "In Progress": 1}
+FULL_CREDIT = 2
+
+
+class ComplianceCoverage:
+    """
+    Per-framework remediation coverage kept up to date from finding changes.
+
+    Each framework tracks how many findings map to it and how much
+    remediation credit they have earned (Fixed counts fully, In Progress
+    half). The framework -> findings inverted index lives in the findings
+    store's compliance index; this class only keeps the running totals, which
+    a change listener adjusts by the difference between a finding's old and
+    new state. Reading coverage is therefore O(frameworks) whatever the
+    number of findings. Frameworks without findings are fully covered.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._findings: Dict[str, int] = {name: 0 for name in FRAMEWORK_KEYS}
+        self._credit: Dict[str, int] = {name: 0 for name in FRAMEWORK_KEYS}
+        with store.lock:
+            for finding in store.all():
+                self._apply(finding, 1)
+            store.subscribe(self._on_change)
+
+    def coverage(self) -> Dict[str, int]:
+        """Return coverage percentage per framework"""
+        with self._lock:
+            return {
+                FRAMEWORK_KEYS.get(name, name): (
+                    round(100 * credit / (FULL_CREDIT * self._findings[name])) if self._findings[name] else 100
+                )
+                for name, credit in self._credit.items()
+            }
+
+    def _on_change(self, action: str, finding: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+        if action == "update":
+            if (previous.get("status") == finding.get("status")
+                    and previous.get("compliance") == finding.get("compliance")):
+                return
+            self._apply(previous, -1)
+            self._apply(finding, 1)
+        else:
+            self._apply(finding, 1 if action == "insert" else -1)
+
+    def _apply(self, finding: Dict[str, Any], sign: int) -> None:
+        frameworks: Iterable[str] = set(finding.get("compliance") or ())
+        credit = STATUS_CREDIT.get(finding.get("status"), 0)
+        with self._lock:
+            for name in frameworks:
+                self._findings[name] = self._findings.get(name, 0) + sign
+                self._credit[name] = self._credit.get(name, 0) + sign * credit
+
@@ -1,50 +1,354 @@
-# Mock data for Infrastructure Drift Detection
-
-mock_drift_detections = [
-    {
-        "id": "drift-1",
-        "resource": "prod-web-server",
-        "resourceType": "EC2",
-        "driftType": "Configuration",
-        "severity": "High",
-        "actualValue": "t3.large",
-        "expectedValue": "t3.medium",
-        "lastSync": "2024-01-14T10:30:00Z"
-    },
-    {
-        "id": "drift-2",
-        "resource": "database-security-group",
-        "resourceType": "Security Group",
-        "driftType": "Security",
-        "severity": "Critical",
-        "actualValue": "0.0.0.0/0 allowed on port 3306",
-        "expectedValue": "10.0.0.0/8 only",
-        "lastSync": "2024-01-14T09:15:00Z"
-    },
-    {
-        "id": "drift-3",
-        "resource": "s3-backup-bucket",
-        "resourceType": "S3",
-        "driftType": "Compliance",
-        "severity": "Medium",
-        "actualValue": "Versioning disabled",
-        "expectedValue": "Versioning enabled",
-        "lastSync": "2024-01-14T11:00:00Z"
-    },
-    {
-        "id": "drift-4",
-        "resource": "lambda-processor",
-        "resourceType": "Lambda",
-        "driftType": "Configuration",
-        "severity": "High",
-        "actualValue": "Memory: 512MB",
-        "expectedValue": "Memory: 256MB",
-        "lastSync": "2024-01-14T08:45:00Z"
-    }
+# Infrastructure Drift Detection: desired (IaC) state vs actual state
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+SEVERITY_ORDER = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+
+# (attribute keyword, drift type, severity); the first rule whose keyword
+# appears in a differing attribute path classifies the drift
+DRIFT_RULES = [
+    ("ingress", "Security", "Critical"),
+    ("egress", "Security", "High"),
+    ("cidr", "Security", "Critical"),
+    ("public", "Security", "Critical"),
+    ("policy", "Security", "High"),
+    ("iam", "Security", "High"),
+    ("security_group", "Security", "High"),
+    ("encrypt", "Compliance", "High"),
+    ("versioning", "Compliance", "Medium"),
+    ("logging", "Compliance", "Medium"),
+    ("backup", "Compliance", "Medium"),
+    ("retention", "Compliance", "Medium"),
+    ("tags", "Compliance", "Low"),
+    ("instance_type", "Configuration", "High"),
+    ("instance_class", "Configuration", "High"),
+    ("memory", "Configuration", "High"),
+    ("size", "Configuration", "Medium"),
 ]
+DEFAULT_DRIFT = ("Configuration", "Medium")
+
+mock_desired_state = {
+    "resources": [
+        {"name": "prod-web-server", "type": "EC2",
+         "attributes": {"instance_type": "t3.medium", "ami": "ami-0abcdef1234567890",
+                        "tags": {"env": "prod", "team": "web"}}},
+        {"name": "database-security-group", "type": "Security Group",
+         "attributes": {"ingress": [{"port": 3306, "protocol": "tcp", "cidr_blocks": ["10.0.0.0/8"]}]}},
+        {"name": "s3-backup-bucket", "type": "S3",
+         "attributes": {"versioning": {"enabled": True}, "encryption": "AES256"}},
+        {"name": "lambda-processor", "type": "Lambda",
+         "attributes": {"memory_size": 256, "timeout": 30, "runtime": "python3.11"}},
+    ]
+}
+
+mock_actual_state = {
+    "timestamp": "2024-01-14T11:00:00Z",
+    "resources": [
+        {"name": "prod-web-server", "type": "EC2",
+         "attributes": {"instance_type": "t3.large", "ami": "ami-0abcdef1234567890",
+                        "tags": {"env": "prod", "team": "web"}}},
+        {"name": "database-security-group", "type": "Security Group",
+         "attributes": {"ingress": [{"port": 3306, "protocol": "tcp", "cidr_blocks": ["0.0.0.0/0"]}]}},
+        {"name": "s3-backup-bucket", "type": "S3",
+         "attributes": {"versioning": {"enabled": False}, "encryption": "AES256"}},
+        {"name": "lambda-processor", "type": "Lambda",
+         "attributes": {"memory_size": 512, "timeout": 30, "runtime": "python3.11"}},
+    ]
+}
+
+
+def content_hash(subtree: Any) -> str:
+    """Return a stable hash of a resource subtree"""
+    encoded = json.dumps(subtree, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def diff_fields(expected: Any, actual: Any, path: str = "") -> List[Tuple[str, Any, Any]]:
+    """
+    Return (path, expected, actual) for every differing leaf
+
+    Nested objects are compared key by key; lists and scalars are compared
+    as whole values.
+    """
+    if expected == actual:
+        return []
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key in sorted(expected.keys() | actual.keys()):
+            child = f"{path}.{key}" if path else key
+            differences.extend(diff_fields(expected.get(key), actual.get(key), child))
+        return differences
+    return [(path, expected, actual)]
+
+
+def classify_drift(field: str) -> Tuple[str, str]:
+    """Return (drift type, severity) for a differing attribute path"""
+    lowered = field.lower()
+    for keyword, drift_type, severity in DRIFT_RULES:
+        if keyword in lowered:
+            return drift_type, severity
+    return DEFAULT_DRIFT
+
+
+def _display(value: Any) -> str:
+    if value is None:
+        return "Not set"
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def diff_resource(name: str, desired: Optional[Dict[str, Any]], actual: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the drift detections for one resource given its desired and actual state"""
+    base = {
+        "resource": name,
+        "resourceType": (desired or actual).get("type", "Unknown")
+    }
+    if actual is None:
+        return [dict(base, id=f"drift-{content_hash([name])[:12]}", field="", driftType="Missing",
+                     severity="High", actualValue="Resource not found", expectedValue="Defined in IaC")]
+    if desired is None:
+        return [dict(base, id=f"drift-{content_hash([name])[:12]}", field="", driftType="Unmanaged",
+                     severity="Medium", actualValue="Resource exists", expectedValue="Not defined in IaC")]
+
+    detections = []
+    for field, expected, found in diff_fields(desired.get("attributes", {}), actual.get("attributes", {})):
+        drift_type, severity = classify_drift(field)
+        detections.append(dict(
+            base,
+            id=f"drift-{content_hash([name, field])[:12]}",
+            field=field,
+            driftType=drift_type,
+            severity=severity,
+            actualValue=_display(found),
+            expectedValue=_display(expected)
+        ))
+    return detections
+
+
+def diff_batch(items: List[Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> List[List[Dict[str, Any]]]:
+    """Diff a batch of (name, desired, actual) resources; runs in scan worker processes"""
+    return [diff_resource(name, desired, actual) for name, desired, actual in items]
+
+
+def shard_key(resource: Dict[str, Any]) -> Tuple[str, str]:
+    """Return the (account, region) a resource is scanned under"""
+    attributes = resource.get("attributes") or {}
+    return (
+        str(resource.get("account") or attributes.get("account") or "default"),
+        str(resource.get("region") or attributes.get("region") or "global")
+    )
+
+
+class DriftEngine:
+    """
+    Compares desired and actual resource state and keeps the resulting
+    drift detections.
+
+    Every resource subtree is stored with its content hash. Loading a new
+    desired or actual document only marks resources whose hash changed, and
+    a scan diffs just those, reusing the previous detections for everything
+    else. Rescanning a large, mostly unchanged estate therefore costs one
+    hash per resource and a handful of diffs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._desired: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._actual: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._last_sync: Dict[str, str] = {}
+        self._diffed: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._detections: Dict[str, List[Dict[str, Any]]] = {}
+        self._dirty: Dict[str, None] = {}
+        self.last_scan: Optional[Dict[str, Any]] = None
+        # Bumped whenever detections, sync times or scan stats may have changed
+        self.version = 0
+
+    def load_desired(self, document: Dict[str, Any]) -> int:
+        """Replace the desired state; returns how many resources changed"""
+        with self._lock:
+            self.version += 1
+            return self._load(self._desired, document)
+
+    def load_actual(self, document: Dict[str, Any]) -> int:
+        """Replace the actual state snapshot; returns how many resources changed"""
+        with self._lock:
+            self.version += 1
+            synced_at = document.get("timestamp") or datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+            return self._load(self._actual, document, synced_at)
+
+    def update_actual(self, resource: Dict[str, Any], synced_at: Optional[str] = None) -> bool:
+        """Record the actual state of a single resource; returns True if it changed"""
+        with self._lock:
+            self.version += 1
+            name = resource["name"]
+            digest = content_hash(resource)
+            self._last_sync[name] = synced_at or datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+            if self._actual.get(name, (None,))[0] == digest:
+                return False
+            self._actual[name] = (digest, resource)
+            self._dirty[name] = None
+            return True
+
+    def scan(self) -> Dict[str, Any]:
+        """Diff every resource whose desired or actual hash changed since it was last diffed"""
+        started = time.perf_counter()
+        changed, work = self.claim_changed()
+        self.apply(
+            (name, hashes, diff_resource(name, desired, actual))
+            for name, hashes, desired, actual in work
+        )
+        return self.record_scan(changed, len(work), time.perf_counter() - started)
+
+    def claim_changed(self) -> Tuple[int, List[Tuple[str, Tuple[Optional[str], Optional[str]], Any, Any]]]:
+        """
+        Take the resources marked changed since the last claim
+
+        Returns:
+            The number of changed resources, and (name, hashes, desired, actual)
+            for each one that needs diffing
+        """
+        with self._lock:
+            self.version += 1
+            dirty, self._dirty = list(self._dirty), {}
+            work = []
+            for name in dirty:
+                hashes = self._hashes(name)
+                if self._diffed.get(name) == hashes:
+                    continue
+                if hashes == (None, None):
+                    self._diffed.pop(name, None)
+                    self._detections.pop(name, None)
+                    self._last_sync.pop(name, None)
+                    continue
+                work.append((name, hashes, self._desired.get(name, (None, None))[1], self._actual.get(name, (None, None))[1]))
+            return len(dirty), work
+
+    def apply(self, results: Iterable[Tuple[str, Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]]]) -> int:
+        """
+        Store diff results for claimed resources
+
+        Results computed against state that has since changed are dropped;
+        the newer change is already marked for the next scan.
+
+        Returns:
+            The number of results stored
+        """
+        stored = 0
+        with self._lock:
+            self.version += 1
+            for name, hashes, detections in results:
+                if self._hashes(name) != hashes:
+                    continue
+                self._diffed[name] = hashes
+                if detections:
+                    self._detections[name] = detections
+                else:
+                    self._detections.pop(name, None)
+                stored += 1
+        return stored
+
+    def release(self, names: Iterable[str]) -> None:
+        """Mark claimed resources as changed again, e.g. when their scan was cancelled"""
+        with self._lock:
+            for name in names:
+                self._dirty[name] = None
+
+    def record_scan(self, changed: int, diffed: int, elapsed: float) -> Dict[str, Any]:
+        """Record and return statistics for a finished scan"""
+        with self._lock:
+            self.version += 1
+            self.last_scan = {
+                "resources": len(self._desired.keys() | self._actual.keys()),
+                "changed": changed,
+                "diffed": diffed,
+                "drifted_resources": len(self._detections),
+                "elapsed_seconds": round(elapsed, 4),
+                "scanned_at": datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+            }
+            return self.last_scan
+
+    def detections(self) -> List[Dict[str, Any]]:
+        """Return current drift detections, most severe first"""
+        with self._lock:
+            drifts = [
+                dict(d, lastSync=self._last_sync.get(d["resource"]))
+                for detections in self._detections.values() for d in detections
+            ]
+        drifts.sort(key=lambda d: (SEVERITY_ORDER.get(d["severity"], len(SEVERITY_ORDER)), d["resource"], d["field"]))
+        return drifts
+
+    def _hashes(self, name: str) -> Tuple[Optional[str], Optional[str]]:
+        return self._desired.get(name, (None,))[0], self._actual.get(name, (None,))[0]
+
+    def _load(self, side: Dict[str, Tuple[str, Dict[str, Any]]], document: Dict[str, Any],
+              synced_at: Optional[str] = None) -> int:
+        incoming = {resource["name"]: resource for resource in document.get("resources", [])}
+        changed = 0
+        for name in side.keys() - incoming.keys():
+            del side[name]
+            self._dirty[name] = None
+            changed += 1
+        for name, resource in incoming.items():
+            if synced_at is not None:
+                self._last_sync[name] = synced_at
+            digest = content_hash(resource)
+            if side.get(name, (None,))[0] != digest:
+                side[name] = (digest, resource)
+                self._dirty[name] = None
+                changed += 1
+        return changed
+
+
+drift_engine = DriftEngine()
+drift_engine.load_desired(mock_desired_state)
+drift_engine.load_actual(mock_actual_state)
+drift_engine.scan()
+
+
+def load_state(desired: Optional[Dict[str, Any]] = None, actual: Optional[Dict[str, Any]] = None,
+               partial: bool = False) -> None:
+    """
+    Load new desired and/or actual state documents into the engine
+
+    With partial=True the actual document only updates the resources it lists
+    instead of replacing the whole snapshot.
+    """
+    if desired is not None:
+        drift_engine.load_desired(desired)
+    if actual is not None:
+        if partial:
+            for resource in actual.get("resources", []):
+                drift_engine.update_actual(resource, actual.get("timestamp"))
+        else:
+            drift_engine.load_actual(actual)
+
+
+def scan_drift(desired: Optional[Dict[str, Any]] = None, actual: Optional[Dict[str, Any]] = None,
+               partial: bool = False) -> Dict[str, Any]:
+    """Load any new state documents and rescan the resources that changed in this process"""
+    load_state(desired, actual, partial)
+    return drift_engine.scan()
+
+
+def get_version() -> int:
+    """Version of get_drift_data()"""
+    return drift_engine.version
+
 
 def get_drift_data():
     """Return all drift detection data"""
+    drifts = drift_engine.detections()
+    counts = Counter(d["severity"] for d in drifts)
     return {
-        "drifts": mock_drift_detections
+        "drifts": drifts,
+        "summary": {severity.lower(): counts[severity] for severity in SEVERITY_ORDER},
+        "last_scan": drift_engine.last_scan
     }
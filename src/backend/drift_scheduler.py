@@ -0,0 +1,172 @@
+"""
+Parallel drift scan scheduler: shards changed resources by account/region
+across a process pool and streams each shard's drifts as it finishes
+"""
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import drift
+
+# Resources per worker task; (account, region) groups larger than this are split
+DEFAULT_MAX_SHARD_SIZE = 2000
+
+
+class DriftScanScheduler:
+    """
+    Runs drift scans in the background on a process pool.
+
+    A scan claims the resources whose content hash changed, groups them by
+    (account, region) and splits large groups so every worker stays busy.
+    Each shard is diffed in a worker process and its results are applied to
+    the engine and published as soon as it completes. Cancelling a scan, or
+    hitting its timeout, stops pending shards and marks their resources as
+    changed again so the next scan picks them up.
+    """
+
+    def __init__(self, engine: drift.DriftEngine,
+                 publish: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 max_workers: Optional[int] = None, max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+                 timeout_seconds: float = 300, retention_seconds: float = 3600):
+        """
+        Initialize the scheduler
+
+        Args:
+            engine: Drift engine holding desired/actual state and detections
+            publish: Called as publish(event, data) for "shard" and "scan" events
+            max_workers: Worker processes (default: one per core)
+            max_shard_size: Maximum resources diffed per worker task
+            timeout_seconds: Scans still running after this long are cancelled
+            retention_seconds: How long finished scans stay available for polling
+        """
+        self.engine = engine
+        self.publish = publish or (lambda event, data: None)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_shard_size = max_shard_size
+        self.timeout_seconds = timeout_seconds
+        self.retention_seconds = retention_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._scans: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self) -> Dict[str, Any]:
+        """Claim changed resources and start scanning them on the running event loop"""
+        self._prune()
+        changed, work = self.engine.claim_changed()
+        shards = self._shard(work)
+        scan = {
+            "scan_id": str(uuid.uuid4()),
+            "status": "running",
+            "created_at": time.time(),
+            "completed_at": None,
+            "error": None,
+            "stats": None,
+            "progress": {
+                "shards_total": len(shards),
+                "shards_done": 0,
+                "resources_total": len(work),
+                "resources_done": 0,
+                "drifts_found": 0
+            }
+        }
+        self._scans[scan["scan_id"]] = scan
+        self._tasks[scan["scan_id"]] = asyncio.ensure_future(self._run(scan, shards, changed))
+        return scan
+
+    def get(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        """Return a scan record by id, or None if unknown or expired"""
+        self._prune()
+        return self._scans.get(scan_id)
+
+    def cancel(self, scan_id: str) -> bool:
+        """Cancel a running scan; returns False if it is not running"""
+        task = self._tasks.get(scan_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def shutdown(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _shard(self, work: List[Tuple]) -> List[Tuple[str, List[Tuple]]]:
+        groups: Dict[Tuple[str, str], List[Tuple]] = {}
+        for item in work:
+            _, _, desired, actual = item
+            groups.setdefault(drift.shard_key(desired or actual), []).append(item)
+        shards = []
+        for (account, region), items in sorted(groups.items()):
+            for start in range(0, len(items), self.max_shard_size):
+                shards.append((f"{account}/{region}#{start // self.max_shard_size}",
+                               items[start:start + self.max_shard_size]))
+        return shards
+
+    async def _run(self, scan: Dict[str, Any], shards: List[Tuple[str, List[Tuple]]], changed: int) -> None:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        if self._executor is None and shards:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        async def diff_shard(shard_id: str, items: List[Tuple]):
+            payload = [(name, desired, actual) for name, _, desired, actual in items]
+            return shard_id, items, await loop.run_in_executor(self._executor, drift.diff_batch, payload)
+
+        async def collect():
+            """Apply and publish each shard as it finishes"""
+            for next_finished in asyncio.as_completed(tasks):
+                shard_id, items, results = await next_finished
+                del pending[shard_id]
+                self.engine.apply(
+                    (name, hashes, detections)
+                    for (name, hashes, _, _), detections in zip(items, results)
+                )
+                drifts = [d for detections in results for d in detections]
+                progress["shards_done"] += 1
+                progress["resources_done"] += len(items)
+                progress["drifts_found"] += len(drifts)
+                self.publish("shard", {
+                    "scan_id": scan["scan_id"],
+                    "shard": shard_id,
+                    "drifts": drifts,
+                    "progress": dict(progress)
+                })
+
+        tasks = [asyncio.ensure_future(diff_shard(shard_id, items)) for shard_id, items in shards]
+        pending = {shard_id: items for shard_id, items in shards}
+        progress = scan["progress"]
+        try:
+            await asyncio.wait_for(collect(), self.timeout_seconds)
+            scan["status"] = "completed"
+            scan["stats"] = self.engine.record_scan(changed, progress["resources_done"], time.perf_counter() - started)
+        except asyncio.CancelledError:
+            scan["status"] = "cancelled"
+            raise
+        except asyncio.TimeoutError:
+            scan["status"] = "failed"
+            scan["error"] = f"Timed out after {self.timeout_seconds:g}s"
+        except Exception as e:
+            scan["status"] = "failed"
+            scan["error"] = str(e)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.engine.release(name for items in pending.values() for name, _, _, _ in items)
+            scan["completed_at"] = time.time()
+            self._tasks.pop(scan["scan_id"], None)
+            self.publish("scan", dict(scan))
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            scan_id for scan_id, scan in self._scans.items()
+            if scan["completed_at"] is not None and scan["completed_at"] < cutoff
+        ]
+        for scan_id in expired:
+            del self._scans[scan_id]
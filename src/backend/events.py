@@ -0,0 +1,122 @@
+"""
+Server-sent event fan-out for pushing data changes to subscribed clients
+"""
+import asyncio
+import itertools
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+
+class Subscription:
+    """
+    A single client's bounded event queue.
+
+    When a slow consumer lets the queue fill up, pending events are dropped
+    and replaced by one "resync" event telling the client to refetch, and
+    nothing more is queued until the client has drained it. This keeps
+    memory per subscriber bounded no matter how far behind it falls.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, filters: Optional[Dict[str, Any]], max_queue: int):
+        self.loop = loop
+        self.filters = {field: value for field, value in (filters or {}).items() if value is not None}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._resync_pending = False
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        return all(data.get(field) == value for field, value in self.filters.items())
+
+    def offer(self, message: str) -> None:
+        """Queue a formatted message; must run on the subscriber's event loop"""
+        if self._resync_pending:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self._resync_pending = True
+            self.queue.put_nowait(format_sse("resync", {"dropped": self.dropped}))
+
+    async def next_message(self) -> str:
+        message = await self.queue.get()
+        if self.queue.empty():
+            self._resync_pending = False
+        return message
+
+
+class EventBroadcaster:
+    """
+    Publishes change events to every matching subscription.
+
+    publish() is thread-safe and can be called from sync routes running in
+    the threadpool; each message is serialized once and handed to the
+    subscriber's event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscriptions: Set[Subscription] = set()
+        self._sequence = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, filters: Optional[Dict[str, Any]] = None) -> Subscription:
+        """Create a subscription bound to the running event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), filters, self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: str, data: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Send an event to every subscription whose filters match data, or
+        matched its previous state, so clients also see records leave their view
+        """
+        with self._lock:
+            targets = [s for s in self._subscriptions
+                       if s.matches(data) or (previous is not None and s.matches(previous))]
+        if not targets:
+            return
+        message = format_sse(event, data, next(self._sequence))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+
+    async def stream(self, subscription: Subscription, is_disconnected, heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """
+        Yield SSE messages for a subscription until the client disconnects,
+        sending a comment line as a heartbeat when the stream is idle
+        """
+        try:
+            yield ": connected\n\n"
+            while not await is_disconnected():
+                try:
+                    yield await asyncio.wait_for(subscription.next_message(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Format one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
@@ -1,4 +1,6 @@
 # Mock data for Incident Coordinator
+import hashlib
+import json
 
 mock_incident_timeline = [
     {
@@ -115,3 +117,8 @@ def get_incident_data():
         "rootCause": mock_root_cause_analysis,
         "checklist": mock_mitigation_checklist
     }
+
+def get_version() -> str:
+    """Version of get_incident_data(): a digest of the payload itself, so edits to the data change it"""
+    payload = json.dumps(get_incident_data(), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
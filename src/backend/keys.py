@@ -0,0 +1,219 @@
+"""
+Security key inventory kept in expiry order, with a scanner that raises expiry alerts
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import alerts
+from store import IndexedStore
+
+TIMESTAMP_FORMAT = alerts.TIMESTAMP_FORMAT
+
+# Days-before-expiry at which an alert is raised; 0 means the key has expired
+KEY_EXPIRY_THRESHOLDS_DAYS = tuple(
+    int(days) for days in os.getenv("KEY_EXPIRY_THRESHOLDS_DAYS", "30,7,1,0").split(",")
+)
+
+mock_security_keys = [
+    {
+        "id": "key-1",
+        "name": "AWS API Key - Production",
+        "type": "API Key",
+        "lastUsed": "2024-01-10T14:30:00Z",
+        "expiresIn": 15,
+        "status": "Active"
+    },
+    {
+        "id": "key-2",
+        "name": "GitHub Deploy Key",
+        "type": "SSH Key",
+        "lastUsed": "2023-12-20T08:15:00Z",
+        "expiresIn": -5,
+        "status": "Expired"
+    },
+    {
+        "id": "key-3",
+        "name": "Service Account - Monitoring",
+        "type": "Service Account",
+        "lastUsed": "2023-10-15T12:00:00Z",
+        "expiresIn": 90,
+        "status": "Unused"
+    },
+    {
+        "id": "key-4",
+        "name": "SSL Certificate",
+        "type": "Certificate",
+        "lastUsed": "2024-01-15T10:00:00Z",
+        "expiresIn": 45,
+        "status": "Active"
+    }
+]
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+def _with_expiry(key: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Anchor a key's relative expiresIn (days) to an absolute expiresAt timestamp"""
+    if key.get("expiresAt") or key.get("expiresIn") is None:
+        return key
+    return dict(key, expiresAt=_timestamp(now + timedelta(days=key["expiresIn"])))
+
+key_store = IndexedStore(
+    [_with_expiry(key, datetime.now(timezone.utc)) for key in mock_security_keys],
+    indexes=("status", "type"),
+    sorted_indexes=("expiresAt",)
+)
+
+def _present(key: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Return a key with expiresIn recomputed as whole days from now"""
+    if not key.get("expiresAt"):
+        return key
+    expires_at = datetime.strptime(key["expiresAt"], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    expires_in = round((expires_at - now) / timedelta(days=1))
+    status = "Expired" if expires_at <= now and key.get("status") == "Active" else key.get("status")
+    return dict(key, expiresIn=expires_in, status=status)
+
+def get_all_keys() -> List[Dict[str, Any]]:
+    """Return every key with days until expiry as of now"""
+    now = datetime.now(timezone.utc)
+    return [_present(key, now) for key in key_store.all()]
+
+def get_expiring_keys(within_days: float) -> List[Dict[str, Any]]:
+    """Return keys that have not expired yet but will within the given number of days, soonest first"""
+    now = datetime.now(timezone.utc)
+    low, high = _timestamp(now), _timestamp(now + timedelta(days=within_days))
+    with key_store.lock:
+        return [
+            _present(key_store.get(key_id), now)
+            for expires_at, key_id in key_store.sorted_index("expiresAt").range(low, high)
+            if expires_at > low
+        ]
+
+def get_expired_keys() -> List[Dict[str, Any]]:
+    """Return keys whose expiry has passed, longest expired first"""
+    now = datetime.now(timezone.utc)
+    with key_store.lock:
+        return [
+            _present(key_store.get(key_id), now)
+            for _, key_id in key_store.sorted_index("expiresAt").range(None, _timestamp(now))
+        ]
+
+def upsert_key(key: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add a key, or update the given fields of an existing one in place so
+    the expiry scanner keeps its alert history unless expiresAt changes.
+    A relative expiresIn is converted to expiresAt. Raises ValueError for
+    an expiresAt or expiresIn that cannot be parsed.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        if key.get("expiresAt"):
+            datetime.strptime(key["expiresAt"], TIMESTAMP_FORMAT)
+        elif key.get("expiresIn") is not None:
+            key = dict(key, expiresIn=float(key["expiresIn"]))
+    except (TypeError, ValueError):
+        raise ValueError(f"expiresAt must look like {_timestamp(now)} and expiresIn must be a number of days")
+    key = _with_expiry(dict(key), now)
+    with key_store.lock:
+        if key["id"] in key_store:
+            return _present(key_store.update(key["id"], key), now)
+        return _present(key_store.insert(key), now)
+
+
+class KeyExpiryScanner:
+    """
+    Raises an alert when a key crosses each expiry threshold, once per key
+    per threshold.
+
+    Each threshold keeps a watermark: the expiresAt bound it has already
+    scanned up to. A scan only walks the slice of the expiry index between
+    the previous and the current bound, so its cost depends on how many keys
+    crossed a threshold since the last scan, not on the inventory size. Keys
+    added or re-dated behind a watermark are picked up through the store
+    listener. A key that crossed several thresholds between scans gets one
+    alert, for the tightest. A key that is rotated (new expiresAt) becomes
+    eligible for alerts again.
+    """
+
+    def __init__(self, store: IndexedStore, thresholds: Sequence[int] = KEY_EXPIRY_THRESHOLDS_DAYS,
+                 raise_alerts: Callable[[List[Dict[str, Any]]], Any] = alerts.ingest_alerts):
+        """
+        Initialize the scanner
+
+        Args:
+            store: Key store with a sorted expiresAt index
+            thresholds: Days-before-expiry thresholds to alert at
+            raise_alerts: Receives each batch of new raw alerts
+        """
+        self._store = store
+        self._thresholds = sorted(set(thresholds))
+        self._raise_alerts = raise_alerts
+        self._lock = threading.Lock()
+        self._watermarks: Dict[int, Optional[str]] = {days: None for days in self._thresholds}
+        self._alerted: Dict[str, int] = {}
+        self._dirty: Dict[str, None] = {}
+        store.subscribe(self._on_change)
+
+    def scan(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Raise alerts for keys that crossed a threshold since the last scan
+
+        Returns:
+            The raw alerts raised by this scan
+        """
+        now = now or datetime.now(timezone.utc)
+        bounds = {days: _timestamp(now + timedelta(days=days)) for days in self._thresholds}
+        due: Dict[str, int] = {}
+        with self._store.lock, self._lock:
+            index = self._store.sorted_index("expiresAt")
+            candidates = dict.fromkeys(self._dirty)
+            self._dirty.clear()
+            for days in self._thresholds:
+                for _, key_id in index.range(self._watermarks[days], bounds[days]):
+                    candidates[key_id] = None
+                self._watermarks[days] = bounds[days]
+
+            for key_id in candidates:
+                key = self._store.get(key_id)
+                if key is None or not key.get("expiresAt"):
+                    continue
+                crossed = next((days for days in self._thresholds if key["expiresAt"] <= bounds[days]), None)
+                if crossed is not None and crossed < self._alerted.get(key_id, float("inf")):
+                    self._alerted[key_id] = crossed
+                    due[key_id] = crossed
+
+            raised = [self._alert_for(self._store.get(key_id), days) for key_id, days in due.items()]
+        if raised:
+            self._raise_alerts(raised)
+        return raised
+
+    def _on_change(self, action: str, key: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if action == "delete":
+                self._alerted.pop(key["id"], None)
+                self._dirty.pop(key["id"], None)
+                return
+            if action == "update" and previous.get("expiresAt") == key.get("expiresAt"):
+                return
+            self._alerted.pop(key["id"], None)
+            self._dirty[key["id"]] = None
+
+    @staticmethod
+    def _alert_for(key: Dict[str, Any], days: int) -> Dict[str, Any]:
+        if days == 0:
+            title, severity = "Security key expired", "Critical"
+        else:
+            title = f"Security key expires within {days} day{'s' if days != 1 else ''}"
+            severity = "High" if days <= 7 else "Warning"
+        return {
+            "title": title,
+            "message": f"{key.get('type', 'Key')} '{key.get('name', key['id'])}' expires at {key['expiresAt']}",
+            "severity": severity,
+            "source": "Security",
+            "affected_resources": [key["id"]]
+        }
+
+
+key_scanner = KeyExpiryScanner(key_store)
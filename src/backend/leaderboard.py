@@ -1,4 +1,6 @@
 # Mock data for Gamified Leaderboard
+import hashlib
+import json
 
 mock_leaderboard_entries = [
     {
@@ -41,3 +43,8 @@ def get_leaderboard():
         "leaderboard": mock_leaderboard_entries,
         "totalSavings": sum(entry["savings"] for entry in mock_leaderboard_entries)
     }
+
+def get_version() -> str:
+    """Version of get_leaderboard(): a digest of the payload itself, so edits to the data change it"""
+    payload = json.dumps(get_leaderboard(), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
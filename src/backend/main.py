@@ -1,17 +1,60 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import aclosing, asynccontextmanager
 import alerts
 import resources
 import security
 import optimization
 import notifications
 import overview
+import incident
+import leaderboard
+import analytics
+import metrics
+import rightsizing
+import drift
+from drift_scheduler import DriftScanScheduler
+import keys
+from events import EventBroadcaster, format_sse
 from agent_integration.agent_client import StrandsAgentClient
 from agent_integration.agent_logic import AgentLogic
-
-app = FastAPI(title="Cloud Management API")
+from agent_integration.cache import InsightCache
+from agent_integration.jobs import AgentJobManager, JobLimitExceeded
+from agent_integration.recommendations import RecommendationParser
+from agent_integration.sessions import AgentSessionRegistry, compute_delta, snapshot_records
+
+KEY_SCAN_INTERVAL_SECONDS = float(os.getenv("KEY_SCAN_INTERVAL_SECONDS", "300"))
+
+async def _scan_key_expiry_periodically():
+    while True:
+        try:
+            await run_in_threadpool(keys.key_scanner.scan)
+        except Exception as e:
+            print(f"Key expiry scan failed: {e}")
+        await asyncio.sleep(KEY_SCAN_INTERVAL_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    key_scan = asyncio.ensure_future(_scan_key_expiry_periodically())
+    await run_in_threadpool(metrics.seed_mock_history, resources.get_all_resources())
+    await run_in_threadpool(rightsizing.run_rightsizing)
+    try:
+        yield
+    finally:
+        metrics.metrics_store.flush()
+        key_scan.cancel()
+        drift_scheduler.shutdown()
+
+app = FastAPI(title="Cloud Management API", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -25,6 +68,139 @@ app.add_middleware(
 # Initialize AWS Strands Agent client
 agent_client = StrandsAgentClient()
 agent_logic = AgentLogic()
+agent_jobs = AgentJobManager()
+insight_cache = InsightCache(
+    max_entries=int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("AGENT_CACHE_TTL_SECONDS", "600"))
+)
+_inflight_insights: Dict[str, asyncio.Task] = {}
+agent_sessions = AgentSessionRegistry(idle_ttl_seconds=float(os.getenv("AGENT_SESSION_TTL_SECONDS", "1800")))
+AGENT_CALL_TIMEOUT_SECONDS = float(os.getenv("AGENT_CALL_TIMEOUT_SECONDS", "30"))
+
+# Drop cached insights for a section as soon as its underlying data changes
+alerts.alert_store.subscribe(lambda *change: insight_cache.invalidate("alerts"))
+resources.resource_store.subscribe(lambda *change: insight_cache.invalidate("resources"))
+security.finding_store.subscribe(lambda *change: insight_cache.invalidate("security"))
+optimization.recommendation_store.subscribe(lambda *change: insight_cache.invalidate("optimization"))
+optimization.subscribe_config(lambda config: insight_cache.invalidate("optimization"))
+
+# Data loader and prompt formatter for each section the agent can analyze
+AGENT_SECTIONS = {
+    "overview": (overview.get_all_overview_data, agent_logic.format_overview_prompt),
+    "alerts": (alerts.get_all_alerts, agent_logic.format_alerts_prompt),
+    "resources": (resources.get_all_resources, agent_logic.format_resources_prompt),
+    "security": (lambda: security.get_all_findings()["findings"], agent_logic.format_security_prompt),
+    "optimization": (optimization.get_optimization_data, agent_logic.format_optimization_prompt),
+}
+
+async def generate_agent_insights(section: str, data: Any = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Format a section's data into a prompt, invoke the agent off the event loop and process the reply
+
+    With a user_id the call continues that user's conversation for the section
+    and only sends what changed since the previous call.
+    """
+    load_data, format_prompt = AGENT_SECTIONS[section]
+    if data is None:
+        data = await run_in_threadpool(load_data)
+    if user_id:
+        return await _session_agent_insights(section, data, user_id)
+    prompt = await run_in_threadpool(format_prompt, data)
+
+    # Identical prompts are served from the cache, and concurrent identical
+    # requests share a single in-flight agent call. The call runs as its own
+    # task, so a cancelled or timed-out caller does not cancel it for the rest
+    key = insight_cache.key_for(prompt)
+    cached = insight_cache.get(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+    inflight = _inflight_insights.get(key)
+    if inflight is not None:
+        return {**(await asyncio.shield(inflight)), "cached": True}
+
+    inflight = asyncio.ensure_future(_shared_agent_insights(key, section, prompt))
+    _inflight_insights[key] = inflight
+    inflight.add_done_callback(lambda task: _finish_inflight(key, task))
+    return await asyncio.shield(inflight)
+
+async def _shared_agent_insights(key: str, section: str, prompt: str) -> Dict[str, Any]:
+    agent_response = await agent_client.invoke_agent_async(prompt)
+    processed_response = agent_logic.process_agent_response(agent_response, section, known_ids=_known_resource_ids())
+    if processed_response.get("agent_enabled"):
+        insight_cache.put(key, section, processed_response)
+    return processed_response
+
+def _finish_inflight(key: str, task: asyncio.Task) -> None:
+    if _inflight_insights.get(key) is task:
+        del _inflight_insights[key]
+    if not task.cancelled():
+        # Mark the exception retrieved so waiter-less failures are not logged
+        task.exception()
+
+async def _session_agent_insights(section: str, data: Any, user_id: str) -> Dict[str, Any]:
+    session = agent_sessions.get(user_id, section)
+    async with session.lock:
+        records = agent_logic.section_records(section, data)
+        snapshot = await run_in_threadpool(snapshot_records, records)
+        if session.turns == 0:
+            prompt = await run_in_threadpool(AGENT_SECTIONS[section][1], data)
+            changes = {"added": len(records), "changed": 0, "removed": 0}
+        else:
+            delta = compute_delta(session.snapshot, snapshot, records)
+            changes = {kind: len(items) for kind, items in delta.items()}
+            if not any(changes.values()):
+                # Nothing new since the agent's last answer in this conversation
+                return {**session.last_response, "incremental": True, "changes": changes}
+            prompt = await run_in_threadpool(agent_logic.format_delta_prompt, section, delta)
+
+        agent_response = await agent_client.invoke_agent_async(prompt, session.session_id)
+        processed_response = agent_logic.process_agent_response(agent_response, section, known_ids=_known_resource_ids())
+        if processed_response.get("agent_enabled"):
+            session.commit(snapshot, processed_response)
+        else:
+            # Start over with the full dataset next time
+            agent_sessions.reset(user_id, section)
+        return {**processed_response, "incremental": session.turns > 1, "changes": changes}
+
+def _known_resource_ids() -> List[str]:
+    """Resource ids the agent may refer to in its recommendations"""
+    return [r["id"] for r in resources.get_all_resources()] + list(security.finding_store.counts("resource"))
+
+# Push alert deltas to /alerts/stream subscribers
+alert_events = EventBroadcaster()
+_ALERT_EVENT_NAMES = {"insert": "create", "update": "update", "delete": "delete"}
+alerts.alert_store.subscribe(
+    lambda action, alert, previous: alert_events.publish(_ALERT_EVENT_NAMES[action], alert, previous)
+)
+
+# Background drift scans stream each finished shard to /drift/stream subscribers
+drift_events = EventBroadcaster()
+drift_scheduler = DriftScanScheduler(
+    drift.drift_engine,
+    publish=drift_events.publish,
+    max_workers=int(os.getenv("DRIFT_SCAN_WORKERS", "0")) or None,
+    timeout_seconds=float(os.getenv("DRIFT_SCAN_TIMEOUT_SECONDS", "300"))
+)
+
+# Conditional GET: ETags pair a per-process id with the data module's version,
+# so a tag issued before a restart never matches
+_ETAG_PREFIX = uuid.uuid4().hex[:12]
+
+def _not_modified(request: Request, response: Response, version: Any) -> Optional[Response]:
+    """
+    Stamp the response with an ETag for the given data version and return a
+    304 response if the client's If-None-Match already has it
+    """
+    parts = version if isinstance(version, tuple) else (version,)
+    etag = f'W/"{_ETAG_PREFIX}-{"-".join(str(part) for part in parts)}"'
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
 
 # Health check endpoint
 @app.get("/")
@@ -41,49 +217,131 @@ def health_check():
         "status": "healthy",
         "agent_status": "configured" if agent_client.is_configured() else "not_configured",
         "agent_details": {
+            "backend": agent_client.backend,
             "region": agent_client.aws_region if agent_client.is_configured() else None,
             "agent_id": agent_client.agent_id if agent_client.is_configured() else None
-        }
+        },
+        "agent_cache": insight_cache.stats(),
+        "agent_circuit": agent_client.circuit_breaker.stats()
     }
 
 # ============= Incident Coordinator Endpoints =============
 
 @app.get("/incident/data")
-def get_incident():
+def get_incident(request: Request, response: Response):
     """Get incident room data (timeline, root cause, checklist)"""
-    return get_incident_data()
+    if (not_modified := _not_modified(request, response, incident.get_version())) is not None:
+        return not_modified
+    return incident.get_incident_data()
 
 # ============= Drift Detection Endpoints =============
 
 @app.get("/drift/data")
-def get_drift():
+def get_drift(request: Request, response: Response):
     """Get infrastructure drift detection data"""
-    return get_drift_data()
+    if (not_modified := _not_modified(request, response, drift.get_version())) is not None:
+        return not_modified
+    return drift.get_drift_data()
+
+class DriftScanRequest(BaseModel):
+    desired: Optional[Dict[str, Any]] = None
+    actual: Optional[Dict[str, Any]] = None
+    partial: bool = False
+
+@app.post("/drift/scan")
+def scan_drift(request: DriftScanRequest):
+    """
+    Load new desired (IaC) and/or actual state documents and rescan for drift.
+    Only resources whose content hash changed are diffed again.
+    """
+    try:
+        return drift.scan_drift(request.desired, request.actual, request.partial)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid state document: {e}")
+
+@app.post("/drift/scans", status_code=202)
+async def start_drift_scan(request: DriftScanRequest):
+    """
+    Load new state like POST /drift/scan, then diff the changed resources in
+    the background across worker processes, sharded by account and region.
+    Poll the returned scan_id for progress or follow /drift/stream.
+    """
+    try:
+        await run_in_threadpool(drift.load_state, request.desired, request.actual, request.partial)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid state document: {e}")
+    return drift_scheduler.start()
+
+@app.get("/drift/scans/{scan_id}")
+async def get_drift_scan(scan_id: str):
+    """Return a background drift scan's status and progress"""
+    scan = drift_scheduler.get(scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Drift scan not found")
+    return scan
+
+@app.delete("/drift/scans/{scan_id}")
+async def cancel_drift_scan(scan_id: str):
+    """Cancel a running drift scan; unfinished resources are rescanned next time"""
+    if not drift_scheduler.cancel(scan_id):
+        raise HTTPException(status_code=404, detail="No running drift scan with that id")
+    return {"success": True, "scan_id": scan_id}
+
+@app.get("/drift/stream")
+async def stream_drift(request: Request):
+    """Server-sent event stream of drift scan results: a "shard" event per finished shard and a "scan" event per finished scan"""
+    subscription = drift_events.subscribe()
+    return StreamingResponse(
+        drift_events.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ============= Leaderboard Endpoints =============
 
 @app.get("/leaderboard")
-def get_leaderboard_data():
+def get_leaderboard_data(request: Request, response: Response):
     """Get gamified leaderboard data"""
-    return get_leaderboard()
+    if (not_modified := _not_modified(request, response, leaderboard.get_version())) is not None:
+        return not_modified
+    return leaderboard.get_leaderboard()
 
 # ============= Security Data Endpoints =============
 
 @app.get("/security/data")
-def get_security_comprehensive():
+def get_security_comprehensive(request: Request, response: Response):
     """Get comprehensive security data (keys, scores, compliance, recommendations)"""
-    return get_security_data()
+    if (not_modified := _not_modified(request, response, security.get_version())) is not None:
+        return not_modified
+    return security.get_security_data()
+
+# Batch mutation models
+class BatchUpdateRequest(BaseModel):
+    ids: List[str]
+    updates: Dict[str, Any]
+
+class BatchIdsRequest(BaseModel):
+    ids: List[str]
+
+def _batch_response(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    succeeded = sum(1 for result in results if result["success"])
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
 
 # Overview endpoint
 @app.get("/overview")
-def get_overview(use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent")):
-    overview_data = overview.get_all_overview_data()
+async def get_overview(
+    request: Request,
+    response: Response,
+    use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent"),
+    x_user_id: Optional[str] = Header(None, description="Reuse this user's agent session and send only data changes")
+):
+    if not use_agent and (not_modified := _not_modified(request, response, overview.get_version())) is not None:
+        return not_modified
+    overview_data = await run_in_threadpool(overview.get_all_overview_data)
     
     if use_agent and agent_client.is_configured():
         # Process through agent
-        prompt = agent_logic.format_overview_prompt(overview_data)
-        agent_response = agent_client.invoke_agent(prompt)
-        processed_response = agent_logic.process_agent_response(agent_response, "overview")
+        processed_response = await generate_agent_insights("overview", overview_data, x_user_id)
         
         return {
             "data": overview_data,
@@ -94,14 +352,31 @@ def get_overview(use_agent: bool = Query(False, description="Enable AI-driven in
 
 # Alerts endpoints
 @app.get("/alerts")
-def get_alerts(use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent")):
-    alerts_data = alerts.get_all_alerts()
+async def get_alerts(
+    use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent"),
+    x_user_id: Optional[str] = Header(None, description="Reuse this user's agent session and send only data changes"),
+    severity: Optional[str] = Query(None, description="Filter by severity (Critical, Warning, ...)"),
+    source: Optional[str] = Query(None, description="Filter by source (Cost, Security, ...)"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    since: Optional[str] = Query(None, description="Only alerts at or after this ISO-8601 timestamp"),
+    until: Optional[str] = Query(None, description="Only alerts at or before this ISO-8601 timestamp"),
+    window_minutes: Optional[int] = Query(None, ge=1, description="Only alerts from the last N minutes")
+):
+    try:
+        if window_minutes is not None:
+            alerts_data = await run_in_threadpool(
+                alerts.get_recent_alerts, window_minutes, severity=severity, source=source, status=status
+            )
+        else:
+            alerts_data = await run_in_threadpool(
+                alerts.query_alerts, severity=severity, source=source, status=status, since=since, until=until
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if use_agent and agent_client.is_configured():
         # Process through agent
-        prompt = agent_logic.format_alerts_prompt(alerts_data)
-        agent_response = agent_client.invoke_agent(prompt)
-        processed_response = agent_logic.process_agent_response(agent_response, "alerts")
+        processed_response = await generate_agent_insights("alerts", alerts_data, x_user_id)
         
         return {
             "alerts": alerts_data,
@@ -110,6 +385,48 @@ def get_alerts(use_agent: bool = Query(False, description="Enable AI-driven insi
     
     return alerts_data
 
+@app.get("/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    severity: Optional[str] = Query(None, description="Only push alerts with this severity"),
+    source: Optional[str] = Query(None, description="Only push alerts from this source"),
+    status: Optional[str] = Query(None, description="Only push alerts with this status")
+):
+    """Server-sent event stream of alert create/update/delete deltas"""
+    subscription = alert_events.subscribe({"severity": severity, "source": source, "status": status})
+    return StreamingResponse(
+        alert_events.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/alerts/ingest")
+async def ingest_alerts(request: Request):
+    """Ingest an NDJSON batch of alerts (one JSON object per line), coalescing duplicates"""
+    batch = []
+    malformed = []
+    body = await request.body()
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            batch.append(json.loads(line.decode("utf-8")))
+        except UnicodeDecodeError:
+            malformed.append({"line": line_number, "error": "Line is not valid UTF-8"})
+        except json.JSONDecodeError as e:
+            malformed.append({"line": line_number, "error": str(e)})
+    result = await run_in_threadpool(alerts.ingest_alerts, batch)
+    result["malformed"] = malformed
+    return result
+
+@app.post("/alerts/batch")
+def update_alerts_batch(request: BatchUpdateRequest):
+    """Apply the same updates (e.g. status) to many alerts at once"""
+    try:
+        return _batch_response(alerts.update_alerts(request.ids, request.updates))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/alerts/{alert_id}")
 def get_alert(alert_id: str):
     alert = alerts.get_alert_by_id(alert_id)
@@ -119,7 +436,10 @@ def get_alert(alert_id: str):
 
 @app.put("/alerts/{alert_id}")
 def update_alert(alert_id: str, updates: Dict[str, Any]):
-    alert = alerts.update_alert(alert_id, updates)
+    try:
+        alert = alerts.update_alert(alert_id, updates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
     return alert
@@ -133,22 +453,74 @@ def delete_alert(alert_id: str):
 
 # Resources endpoints
 @app.get("/resources")
-def get_resources(use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent")):
-    resources_data = resources.get_all_resources()
+async def get_resources(
+    use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent"),
+    x_user_id: Optional[str] = Header(None, description="Reuse this user's agent session and send only data changes"),
+    type: Optional[str] = Query(None, description="Filter by resource type (EC2, RDS, S3, ...)"),
+    region: Optional[str] = Query(None, description="Filter by region"),
+    provider: Optional[str] = Query(None, description="Filter by cloud provider"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    min_utilization: Optional[float] = Query(None, ge=0, le=100),
+    max_utilization: Optional[float] = Query(None, ge=0, le=100),
+    sort_by: Optional[str] = Query(None, description="Sort field: id, monthly_cost or utilization"),
+    order: str = Query("asc", description="Sort order: asc or desc"),
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; enables paginated responses")
+):
+    try:
+        page = await run_in_threadpool(
+            resources.query_resources,
+            type=type, region=region, provider=provider, status=status,
+            min_utilization=min_utilization, max_utilization=max_utilization,
+            sort_by=sort_by, order=order, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    resources_data = page["items"]
+    paginated = limit is not None or cursor is not None
     
     if use_agent and agent_client.is_configured():
         # Process through agent
-        prompt = agent_logic.format_resources_prompt(resources_data)
-        agent_response = agent_client.invoke_agent(prompt)
-        processed_response = agent_logic.process_agent_response(agent_response, "resources")
+        processed_response = await generate_agent_insights("resources", resources_data, x_user_id)
         
         return {
             "resources": resources_data,
+            "next_cursor": page["next_cursor"],
             "agent_insights": processed_response
         }
     
+    if paginated:
+        return page
     return resources_data
 
+@app.get("/resources/analytics")
+def get_resources_analytics(
+    group_by: str = Query("region,provider,type", description="Comma-separated grouping dimensions"),
+    idle_threshold: float = Query(5.0, ge=0, le=100, description="Utilization % below which a resource counts as idle")
+):
+    """Get cost and utilization aggregates across the resource inventory"""
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip()]
+    try:
+        return analytics.get_resource_analytics(group_by=dimensions, idle_threshold=idle_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/resources/rightsizing")
+def get_resources_rightsizing(
+    min_savings: float = Query(0.0, ge=0, description="Only return resources saving at least this much per month"),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Get the last right-sizing run's per-resource percentiles and recommended instance types"""
+    return rightsizing.get_rightsizing(min_savings=min_savings, limit=limit)
+
+@app.post("/resources/rightsizing")
+async def run_resources_rightsizing():
+    """
+    Recompute right-sizing for the whole fleet from utilization history and
+    update every resource's recommendations and estimated_savings
+    """
+    return await run_in_threadpool(rightsizing.run_rightsizing)
+
 @app.get("/resources/{resource_id}")
 def get_resource(resource_id: str):
     resource = resources.get_resource_by_id(resource_id)
@@ -158,28 +530,66 @@ def get_resource(resource_id: str):
 
 @app.put("/resources/{resource_id}/optimize")
 def optimize_resource(resource_id: str):
-    resource = resources.get_resource_by_id(resource_id)
-    if not resource:
-        raise HTTPException(status_code=404, detail="Resource not found")
-    
     # Apply optimization - reduce cost by 30%
-    updated_resource = resources.update_resource(resource_id, {
-        "status": "Optimized",
-        "monthly_cost": round(resource["monthly_cost"] * 0.7, 2)
-    })
+    updated_resource = resources.optimize_resource(resource_id, 0.7)
+    if not updated_resource:
+        raise HTTPException(status_code=404, detail="Resource not found")
     return updated_resource
 
+@app.post("/resources/optimize/batch")
+def optimize_resources_batch(request: BatchIdsRequest):
+    """Optimize many resources at once"""
+    return _batch_response(resources.optimize_resources(request.ids, 0.7))
+
+# Metrics endpoints
+class MetricSamplesRequest(BaseModel):
+    metric: str
+    values: Dict[str, float]
+    timestamp: Optional[str] = None
+
+@app.post("/metrics")
+def ingest_metrics(request: MetricSamplesRequest):
+    """Record one sample per resource for a metric, e.g. a scrape of every resource's CPU"""
+    timestamp = request.timestamp or time.time()
+    unknown = [resource_id for resource_id in request.values if resource_id not in resources.resource_store]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown resource ids: {', '.join(unknown[:20])}")
+    try:
+        stored = metrics.ingest_metrics(request.metric, timestamp, request.values)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "stored": stored}
+
+@app.get("/metrics/{resource_id}")
+def get_metrics(
+    resource_id: str,
+    metric: str = Query("cpu", description="cpu, memory or response_time_ms"),
+    start: Optional[str] = Query(None, description="ISO-8601 start (default: 24 hours before end)"),
+    end: Optional[str] = Query(None, description="ISO-8601 end (default: now)"),
+    resolution: Optional[str] = Query(None, description="1m, 1h or 1d (default: picked from the time range)")
+):
+    """Get a resource's metric history, downsampled to the requested resolution"""
+    try:
+        return metrics.get_metric_series(resource_id, metric, start, end, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Security endpoints
 @app.get("/security")
-def get_security(use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent")):
-    security_data = security.get_all_findings()
+async def get_security(
+    use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent"),
+    severity: Optional[str] = Query(None, description="Filter findings by severity"),
+    status: Optional[str] = Query(None, description="Filter findings by status"),
+    resource: Optional[str] = Query(None, description="Filter findings by affected resource"),
+    framework: Optional[str] = Query(None, description="Filter findings by compliance framework, e.g. GDPR"),
+    x_user_id: Optional[str] = Header(None, description="Reuse this user's agent session and send only data changes")
+):
+    security_data = await run_in_threadpool(_security_data, severity, status, resource, framework)
     findings = security_data.get("findings", [])
     
     if use_agent and agent_client.is_configured():
         # Process through agent
-        prompt = agent_logic.format_security_prompt(findings)
-        agent_response = agent_client.invoke_agent(prompt)
-        processed_response = agent_logic.process_agent_response(agent_response, "security")
+        processed_response = await generate_agent_insights("security", findings, x_user_id)
         
         return {
             **security_data,
@@ -188,6 +598,35 @@ def get_security(use_agent: bool = Query(False, description="Enable AI-driven in
     
     return security_data
 
+def _security_data(severity: Optional[str], status: Optional[str],
+                   resource: Optional[str], framework: Optional[str]) -> Dict[str, Any]:
+    if any(value is not None for value in (severity, status, resource, framework)):
+        return {
+            "findings": security.query_findings(severity, status, resource, framework),
+            "summary": security.get_findings_summary()
+        }
+    return security.get_all_findings()
+
+@app.get("/security/keys")
+def get_security_keys(
+    expiring_within_days: Optional[float] = Query(None, ge=0, description="Only keys expiring within this many days"),
+    expired: bool = Query(False, description="Only keys that have already expired")
+):
+    """List security keys, optionally only those expiring soon or already expired"""
+    if expired:
+        return keys.get_expired_keys()
+    if expiring_within_days is not None:
+        return keys.get_expiring_keys(expiring_within_days)
+    return keys.get_all_keys()
+
+@app.put("/security/keys/{key_id}")
+def put_security_key(key_id: str, key: Dict[str, Any]):
+    """Add or rotate a security key; expiry is given as expiresAt or as expiresIn days from now"""
+    try:
+        return {"success": True, "key": keys.upsert_key({**key, "id": key_id})}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/security/{finding_id}")
 def get_security_finding(finding_id: str):
     finding = security.get_finding_by_id(finding_id)
@@ -197,21 +636,37 @@ def get_security_finding(finding_id: str):
 
 @app.post("/security/update")
 def update_security_finding(finding_id: str, updates: Dict[str, Any]):
-    finding = security.update_finding(finding_id, updates)
+    try:
+        finding = security.update_finding(finding_id, updates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not finding:
         raise HTTPException(status_code=404, detail="Security finding not found")
     return {"success": True, "finding": finding}
 
+@app.post("/security/update/batch")
+def update_security_findings_batch(request: BatchUpdateRequest):
+    """Apply the same updates (e.g. status) to many security findings at once"""
+    try:
+        return _batch_response(security.update_findings(request.ids, request.updates))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Optimization endpoints
 @app.get("/optimization")
-def get_optimization(use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent")):
-    optimization_data = optimization.get_optimization_data()
+async def get_optimization(
+    request: Request,
+    response: Response,
+    use_agent: bool = Query(False, description="Enable AI-driven insights via AWS Strands Agent"),
+    x_user_id: Optional[str] = Header(None, description="Reuse this user's agent session and send only data changes")
+):
+    if not use_agent and (not_modified := _not_modified(request, response, optimization.get_version())) is not None:
+        return not_modified
+    optimization_data = await run_in_threadpool(optimization.get_optimization_data)
     
     if use_agent and agent_client.is_configured():
         # Process through agent
-        prompt = agent_logic.format_optimization_prompt(optimization_data)
-        agent_response = agent_client.invoke_agent(prompt)
-        processed_response = agent_logic.process_agent_response(agent_response, "optimization")
+        processed_response = await generate_agent_insights("optimization", optimization_data, x_user_id)
         
         return {
             **optimization_data,
@@ -220,6 +675,18 @@ def get_optimization(use_agent: bool = Query(False, description="Enable AI-drive
     
     return optimization_data
 
+@app.get("/optimization/scenarios")
+def get_optimization_scenarios(
+    step: int = Query(10, ge=5, le=50, description="Slider step in percent for right-sizing and auto-scaling levels"),
+    include_grid: bool = Query(False, description="Also return every evaluated scenario")
+):
+    """
+    Evaluate every right-sizing x auto-scaling x toggle combination against
+    the resource inventory and return the Pareto frontier of monthly savings,
+    CO2 reduction and risk, plus the projection for the current config
+    """
+    return optimization.get_optimization_scenarios(step=step, include_grid=include_grid)
+
 @app.post("/optimization/config")
 def update_optimization(config: Dict[str, Any]):
     return optimization.update_optimization_config(config)
@@ -231,6 +698,138 @@ def apply_optimization_action(optimization_id: str):
         raise HTTPException(status_code=404, detail=result.get("message"))
     return result
 
+@app.post("/optimization/apply/batch")
+def apply_optimizations_batch(request: BatchIdsRequest):
+    """Apply many optimization recommendations at once"""
+    return _batch_response(optimization.apply_optimizations(request.ids))
+
+# Agent job endpoints
+class AgentJobRequest(BaseModel):
+    section: str
+
+@app.post("/agent/jobs", status_code=202)
+async def submit_agent_job(request: AgentJobRequest):
+    """Start an agent analysis for a section in the background and return a job id to poll"""
+    if request.section not in AGENT_SECTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown section. Use one of: {', '.join(AGENT_SECTIONS)}")
+    try:
+        job = agent_jobs.submit(request.section, generate_agent_insights(request.section))
+    except JobLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+@app.get("/agent/jobs/{job_id}")
+async def get_agent_job(job_id: str):
+    """Poll an agent job; result holds the processed agent insights once completed"""
+    job = agent_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Agent job not found")
+    return job
+
+@app.get("/agent/insights/dashboard")
+async def stream_dashboard_insights(
+    timeout: float = Query(AGENT_CALL_TIMEOUT_SECONDS, gt=0, le=300, description="Per-section timeout in seconds"),
+    x_user_id: Optional[str] = Header(None, description="Reuse this user's agent sessions and send only data changes")
+):
+    """
+    Run the agent for every dashboard section concurrently and stream each
+    section's insights as a server-sent "section" event as soon as it finishes,
+    followed by a "done" event. Sections that exceed the timeout report an error.
+    """
+    return StreamingResponse(
+        _stream_dashboard_insights(timeout, x_user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _section_insights(section: str, timeout: float, user_id: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        insights = await asyncio.wait_for(generate_agent_insights(section, user_id=user_id), timeout=timeout)
+        return {"section": section, "agent_insights": insights}
+    except asyncio.TimeoutError:
+        return {"section": section, "error": f"Timed out after {timeout:g}s"}
+    except Exception as e:
+        return {"section": section, "error": str(e)}
+
+async def _stream_dashboard_insights(timeout: float, user_id: Optional[str] = None):
+    started = time.monotonic()
+    tasks = [asyncio.ensure_future(_section_insights(section, timeout, user_id)) for section in AGENT_SECTIONS]
+    completed = failed = 0
+    try:
+        for next_finished in asyncio.as_completed(tasks):
+            result = await next_finished
+            if "error" in result:
+                failed += 1
+            else:
+                completed += 1
+            yield format_sse("section", result)
+        yield format_sse("done", {
+            "completed": completed,
+            "failed": failed,
+            "elapsed_seconds": round(time.monotonic() - started, 3)
+        })
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.get("/agent/stream/{section}")
+async def stream_agent_insights(section: str):
+    """
+    Stream agent insights for a section over server-sent events: a "chunk"
+    event per generated text fragment, a "recommendation" event as soon as
+    each recommendation line is complete, then one "insights" event with the
+    processed response once generation finishes
+    """
+    if section not in AGENT_SECTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown section. Use one of: {', '.join(AGENT_SECTIONS)}")
+    return StreamingResponse(
+        _stream_agent_insights(section),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _stream_agent_insights(section: str):
+    load_data, format_prompt = AGENT_SECTIONS[section]
+    prompt = await run_in_threadpool(lambda: format_prompt(load_data()))
+    key = insight_cache.key_for(prompt)
+    cached = insight_cache.get(key)
+    if cached is not None:
+        yield format_sse("insights", {**cached, "cached": True})
+        return
+    known_ids = await run_in_threadpool(_known_resource_ids)
+    if not agent_client.is_configured():
+        agent_response = await run_in_threadpool(agent_client.invoke_agent, prompt)
+        yield format_sse("insights", agent_logic.process_agent_response(agent_response, section, known_ids=known_ids))
+        return
+
+    session_id = str(uuid.uuid4())
+    parts = []
+    parser = RecommendationParser(known_ids)
+    try:
+        async with aclosing(agent_client.stream_agent_async(prompt, session_id)) as chunks:
+            async for text in chunks:
+                parts.append(text)
+                yield format_sse("chunk", {"text": text})
+                for recommendation in parser.feed(text):
+                    yield format_sse("recommendation", recommendation.to_dict())
+        for recommendation in parser.close():
+            yield format_sse("recommendation", recommendation.to_dict())
+        agent_response = {
+            "success": True,
+            "insights": "".join(parts),
+            "session_id": session_id,
+            "agent_id": agent_client.agent_id
+        }
+    except Exception as e:
+        print(f"AWS Strands Agent streaming error: {e}")
+        agent_response = {"success": False, "error": str(e), "insights": f"Agent invocation failed: {e}"}
+
+    # Recommendations were already parsed from the stream
+    processed_response = agent_logic.process_agent_response(agent_response, section, parser.recommendations)
+    if processed_response.get("agent_enabled"):
+        insight_cache.put(key, section, processed_response)
+    yield format_sse("insights", processed_response)
+
 # Notification settings models
 class NotificationSettings(BaseModel):
     email_enabled: Optional[bool] = False
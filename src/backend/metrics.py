@@ -0,0 +1,473 @@
+"""
+Per-resource metrics time series in fixed-width arrays, rolled up to 1m/1h/1d
+and persisted as memory-mapped segment files
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Storage dtype and encoding scale per metric: a sample v is stored as
+# round(v * scale) + 1, so 0 marks a missing sample and fresh (sparse) files read as empty
+METRICS: Dict[str, Tuple[type, float]] = {
+    "cpu": (np.uint8, 2.0),               # percent, 0.5% steps
+    "memory": (np.uint8, 2.0),            # percent, 0.5% steps
+    "response_time_ms": (np.uint16, 1.0)  # milliseconds, up to ~65s
+}
+
+# (bucket seconds, retention days) per resolution. 1m holds raw samples;
+# 1h and 1d keep sum, count and max so means and peaks survive downsampling.
+# Rollups must be retained at least as long as raw samples; raw minutes are
+# the bulk of the footprint, so they are kept only as long as right-sizing
+# and recent charts need them and the rollups cover the rest.
+TIERS: Dict[str, Tuple[int, int]] = {
+    "1m": (60, int(os.getenv("METRICS_RAW_RETENTION_DAYS", "14"))),
+    "1h": (3600, int(os.getenv("METRICS_HOURLY_RETENTION_DAYS", "90"))),
+    "1d": (86400, int(os.getenv("METRICS_DAILY_RETENTION_DAYS", "730")))
+}
+RAW_TIER = "1m"
+
+# Samples stamped further than this ahead of the server clock are rejected, so
+# one bad clock cannot move every ring buffer's head into the future
+MAX_CLOCK_SKEW_SECONDS = int(os.getenv("METRICS_MAX_CLOCK_SKEW_SECONDS", "300"))
+
+# Series are stored in segments of up to this many resources; a segment's files
+# are laid out time-major, so one scrape of every resource touches one page per
+# segment. A segment starts with room for MIN_SEGMENT_SERIES and doubles as
+# series are added, so a small fleet only allocates for the series it has.
+SERIES_PER_SEGMENT = int(os.getenv("METRICS_SERIES_PER_SEGMENT", "1024"))
+MIN_SEGMENT_SERIES = 16
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "cloud-management-api", "metrics"
+))
+
+# Index arrays built while clearing ring-buffer gaps are kept below this many elements
+_CLEAR_CHUNK = 1 << 22
+# Slots copied at a time when a segment grows
+_COPY_ROWS = 4096
+
+
+def _encode(values: np.ndarray, dtype: type, scale: float) -> np.ndarray:
+    top = np.iinfo(dtype).max - 1
+    return (np.clip(np.rint(values * scale), 0, top) + 1).astype(dtype)
+
+
+def _decode(codes: np.ndarray, scale: float) -> np.ndarray:
+    values = (codes.astype(np.float32) - 1) / scale
+    values[codes == 0] = np.nan
+    return values
+
+
+def _epoch(value: Any) -> float:
+    """Seconds since the epoch from a number or an ISO-8601 timestamp"""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _accepted_range() -> Tuple[float, float]:
+    """(exclusive start, inclusive end) in epoch seconds of sample times ingest accepts"""
+    now = time.time()
+    return now - TIERS[RAW_TIER][1] * 86400, now + MAX_CLOCK_SKEW_SECONDS
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class _Segment:
+    """
+    Memory-mapped ring buffers for one block of series, every tier and
+    metric, with room for `capacity` series. An existing segment reopens
+    with the capacity its files were written with.
+    """
+
+    def __init__(self, directory: str, number: int, capacity: int):
+        self.directory = directory
+        self.number = number
+        head_path = os.path.join(directory, self._name(RAW_TIER, next(iter(METRICS)), "head"))
+        if os.path.exists(head_path):
+            capacity = os.path.getsize(head_path) // np.dtype(np.int64).itemsize
+        self.capacity = capacity
+        self.arrays: Dict[Tuple[str, str, str], np.memmap] = {
+            key: self._open(self._name(*key), dtype, shape) for key, (dtype, shape) in self._layout(capacity).items()
+        }
+
+    def grow(self, capacity: int) -> None:
+        """
+        Widen every file to `capacity` series. Files are rewritten under a
+        temporary name and swapped in, copying only the slot ranges that hold
+        data so unwritten pages stay sparse.
+        """
+        grown = {}
+        for key, (dtype, shape) in self._layout(capacity).items():
+            old = self.arrays[key]
+            new = np.memmap(os.path.join(self.directory, self._name(*key) + ".tmp"), dtype=dtype, mode="w+", shape=shape)
+            if old.ndim == 1:
+                new[:self.capacity] = old
+            else:
+                for begin in range(0, len(old), _COPY_ROWS):
+                    block = old[begin:begin + _COPY_ROWS]
+                    if block.any():
+                        new[begin:begin + _COPY_ROWS, :self.capacity] = block
+            new.flush()
+            grown[key] = new
+        # Heads go last: a segment whose head file still has the old width reopens at the old width
+        for key in sorted(grown, key=lambda key: key[2] == "head"):
+            path = os.path.join(self.directory, self._name(*key))
+            os.replace(path + ".tmp", path)
+        self.arrays = {key: self._open(self._name(*key), dtype, shape)
+                       for key, (dtype, shape) in self._layout(capacity).items()}
+        self.capacity = capacity
+
+    def _name(self, tier: str, metric: str, field: str) -> str:
+        return f"{self.number:05d}.{tier}.{metric}.{field}"
+
+    @staticmethod
+    def _layout(capacity: int) -> Dict[Tuple[str, str, str], Tuple[type, Tuple[int, ...]]]:
+        """(dtype, shape) of every array in a segment holding `capacity` series"""
+        layout = {}
+        for tier, (step, days) in TIERS.items():
+            slots = days * 86400 // step
+            for metric, (dtype, _) in METRICS.items():
+                fields = {"value": dtype} if tier == RAW_TIER else {"sum": np.float32, "count": np.uint16, "max": dtype}
+                for field, field_dtype in fields.items():
+                    layout[(tier, metric, field)] = (field_dtype, (slots, capacity))
+                # Newest bucket written per series, plus one; 0 means no samples yet
+                layout[(tier, metric, "head")] = (np.int64, (capacity,))
+        return layout
+
+    def _open(self, name: str, dtype: type, shape: Tuple[int, ...]) -> np.memmap:
+        path = os.path.join(self.directory, name)
+        expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if os.path.exists(path):
+            if os.path.getsize(path) != expected:
+                raise ValueError(f"Metrics segment {name} does not match the configured retention; "
+                                 f"move {self.directory} aside to start a new store")
+            return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+        # w+ only writes the last byte, so untouched pages stay sparse (and read as missing)
+        return np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+
+    def flush(self) -> None:
+        for array in self.arrays.values():
+            array.flush()
+
+
+class MetricsStore:
+    """
+    Time series of per-resource metrics with automatic downsampling.
+
+    Each (tier, metric) is a ring buffer of fixed-width slots per series, so
+    a series' footprint depends only on retention, never on how much was
+    written: with the default retention (14 days of minutes, 90 of hours,
+    two years of days) all three metrics take about 140 KB per resource.
+    Buffers are memory-mapped segment files that grow with the number of
+    series, so only the pages being read or written stay resident and a
+    restart reopens the files instead of reloading samples.
+
+    Samples are ingested in batches; every write also folds the sample into
+    the 1h and 1d rollups (sum, count, max), correcting for a minute that
+    is written twice. When a series advances past buckets it skipped, those
+    slots are cleared so stale data from the previous lap of the ring never
+    shows through.
+    """
+
+    def __init__(self, directory: str = METRICS_DIR, series_per_segment: int = SERIES_PER_SEGMENT):
+        self.directory = directory
+        self.series_per_segment = series_per_segment
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._series: List[str] = []
+        self._rows: Dict[str, int] = {}
+        index_path = os.path.join(directory, "series.json")
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                saved = json.load(f)
+            if saved.get("series_per_segment") != series_per_segment:
+                raise ValueError(f"{directory} was written with {saved.get('series_per_segment')} series per segment")
+            for resource_id in saved["series"]:
+                self._add_series(resource_id)
+
+    def __contains__(self, resource_id: str) -> bool:
+        return resource_id in self._rows
+
+    def ingest(self, metric: str, resource_ids: Sequence[str], timestamps: Any, values: Sequence[float]) -> int:
+        """
+        Record samples for one metric. timestamps is one time for every
+        sample (epoch seconds or ISO-8601) or one per sample. NaN values,
+        samples older than raw retention and samples more than
+        MAX_CLOCK_SKEW_SECONDS ahead of now are skipped; for a repeated
+        (resource, minute) the last value wins.
+
+        Returns:
+            Number of samples stored
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(METRICS)}")
+        dtype, scale = METRICS[metric]
+        values = np.asarray(values, dtype=np.float64)
+        if isinstance(timestamps, (int, float, str)):
+            seconds = np.full(len(values), _epoch(timestamps))
+        elif isinstance(timestamps, np.ndarray) and timestamps.dtype.kind in "iuf":
+            seconds = timestamps.astype(np.float64)
+        else:
+            seconds = np.array([_epoch(t) for t in timestamps], dtype=np.float64)
+        if len(seconds) != len(values) or len(resource_ids) != len(values):
+            raise ValueError("resource_ids, timestamps and values must have the same length")
+        earliest, latest = _accepted_range()
+        keep = ~np.isnan(values) & (seconds > earliest) & (seconds <= latest)
+        if not keep.all():
+            # Drop skipped samples before any series is created for them
+            resource_ids = [resource_id for resource_id, kept in zip(resource_ids, keep.tolist()) if kept]
+            seconds, values = seconds[keep], values[keep]
+
+        with self._lock:
+            new_ids = [resource_id for resource_id in dict.fromkeys(resource_ids) if resource_id not in self._rows]
+            for resource_id in new_ids:
+                self._add_series(resource_id)
+            if new_ids:
+                self._save_index()
+            rows = np.array([self._rows[resource_id] for resource_id in resource_ids], dtype=np.int64)
+            minutes = (seconds // TIERS[RAW_TIER][0]).astype(np.int64)
+            # Last sample wins for a repeated (series, minute)
+            keys = rows[::-1] * (1 << 32) + minutes[::-1]
+            _, last = np.unique(keys, return_index=True)
+            last = len(rows) - 1 - last
+            rows, minutes, values = rows[last], minutes[last], values[last]
+
+            stored = 0
+            segment_numbers = rows // self.series_per_segment
+            for number in np.unique(segment_numbers):
+                in_segment = segment_numbers == number
+                stored += self._write(self._segments[number], metric, dtype, scale,
+                                      rows[in_segment] % self.series_per_segment,
+                                      minutes[in_segment], values[in_segment])
+            return stored
+
+    def window(self, metric: str, resource_ids: Sequence[str], start: Any, end: Any,
+               resolution: str = RAW_TIER, field: str = "mean") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (bucket start times, matrix) for [start, end] at a resolution,
+        with one row per resource and NaN where there is no data. Rollup
+        resolutions return the bucket mean, or its max with field="max".
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(METRICS)}")
+        if resolution not in TIERS:
+            raise ValueError(f"Unknown resolution '{resolution}'. Use one of: {', '.join(TIERS)}")
+        dtype, scale = METRICS[metric]
+        step, days = TIERS[resolution]
+        slots = days * 86400 // step
+        first, last = int(_epoch(start) // step), int(_epoch(end) // step)
+        buckets = np.arange(max(first, last - slots + 1), last + 1, dtype=np.int64)
+        matrix = np.full((len(resource_ids), len(buckets)), np.nan, dtype=np.float32)
+
+        with self._lock:
+            rows = np.array([self._rows.get(resource_id, -1) for resource_id in resource_ids], dtype=np.int64)
+            segment_numbers = np.where(rows >= 0, rows // self.series_per_segment, -1)
+            for number in np.unique(segment_numbers[segment_numbers >= 0]):
+                selected = np.flatnonzero(segment_numbers == number)
+                local = rows[selected] % self.series_per_segment
+                segment = self._segments[number]
+                newest = segment.arrays[(resolution, metric, "head")][local] - 1
+                live = ((buckets[None, :] <= newest[:, None]) & (buckets[None, :] > newest[:, None] - slots)
+                        & (newest[:, None] >= 0))
+                cells = np.ix_(buckets % slots, local)
+                if resolution == RAW_TIER:
+                    data = _decode(segment.arrays[(resolution, metric, "value")][cells].T, scale)
+                elif field == "max":
+                    data = _decode(segment.arrays[(resolution, metric, "max")][cells].T, scale)
+                else:
+                    sums = segment.arrays[(resolution, metric, "sum")][cells].T
+                    counts = segment.arrays[(resolution, metric, "count")][cells].T
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        data = np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+                matrix[selected] = np.where(live, data, np.nan)
+        return buckets * step, matrix
+
+    def series(self, metric: str, resource_id: str, start: Any, end: Any,
+               resolution: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return one resource's points in [start, end]. Without a resolution the
+        finest one that keeps the response under ~3,000 points is used.
+        """
+        start_seconds, end_seconds = _epoch(start), _epoch(end)
+        if end_seconds < start_seconds:
+            raise ValueError("end must not be before start")
+        if resolution is None:
+            span = end_seconds - start_seconds
+            resolution = next(
+                (tier for tier, (step, _) in TIERS.items() if span / step <= 3000), list(TIERS)[-1]
+            )
+        times, means = self.window(metric, [resource_id], start_seconds, end_seconds, resolution)
+        peaks = means if resolution == RAW_TIER else self.window(
+            metric, [resource_id], start_seconds, end_seconds, resolution, field="max"
+        )[1]
+        points = []
+        for moment, mean, peak in zip(times.tolist(), means[0].tolist(), peaks[0].tolist()):
+            if mean != mean:
+                continue
+            point = {"timestamp": _timestamp(moment), "value": round(mean, 2)}
+            if resolution != RAW_TIER:
+                point["max"] = round(peak, 2)
+            points.append(point)
+        return {"resource_id": resource_id, "metric": metric, "resolution": resolution, "points": points}
+
+    def utilization_history(self, fleet: List[Dict[str, Any]], days: int = 14) -> Tuple[np.ndarray, np.ndarray]:
+        """Hourly mean CPU and memory for the last `days` days, shaped (resources, hours)"""
+        end = time.time()
+        start = end - days * 86400
+        ids = [resource["id"] for resource in fleet]
+        _, cpu = self.window("cpu", ids, start, end, "1h")
+        _, memory = self.window("memory", ids, start, end, "1h")
+        return cpu, memory
+
+    def flush(self) -> None:
+        """Write dirty pages of every segment to disk"""
+        with self._lock:
+            for segment in self._segments:
+                segment.flush()
+
+    def _add_series(self, resource_id: str) -> None:
+        row = len(self._series)
+        number, local = divmod(row, self.series_per_segment)
+        if number == len(self._segments):
+            os.makedirs(self.directory, exist_ok=True)
+            self._segments.append(_Segment(self.directory, number, min(MIN_SEGMENT_SERIES, self.series_per_segment)))
+        segment = self._segments[number]
+        if local >= segment.capacity:
+            segment.grow(min(2 * segment.capacity, self.series_per_segment))
+        self._series.append(resource_id)
+        self._rows[resource_id] = row
+
+    def _save_index(self) -> None:
+        path = os.path.join(self.directory, "series.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"series_per_segment": self.series_per_segment, "series": self._series}, f)
+        os.replace(path + ".tmp", path)
+
+    def _write(self, segment: _Segment, metric: str, dtype: type, scale: float,
+               local: np.ndarray, minutes: np.ndarray, values: np.ndarray) -> int:
+        raw_slots = TIERS[RAW_TIER][1] * 86400 // TIERS[RAW_TIER][0]
+        raw = segment.arrays[(RAW_TIER, metric, "value")]
+        accepted = self._advance(segment, RAW_TIER, metric, raw_slots, local, minutes)
+        local, minutes, values = local[accepted], minutes[accepted], values[accepted]
+        if not len(local):
+            return 0
+        codes = _encode(values, dtype, scale)
+        positions = minutes % raw_slots
+        previous = raw[positions, local]
+        raw[positions, local] = codes
+        # A minute written again replaces its earlier contribution to the rollups
+        rewritten = previous > 0
+        delta = _decode(codes, scale) - np.where(rewritten, _decode(previous, scale), 0)
+
+        minute_seconds = minutes * TIERS[RAW_TIER][0]
+        for tier, (step, days) in TIERS.items():
+            if tier == RAW_TIER:
+                continue
+            slots = days * 86400 // step
+            buckets = minute_seconds // step
+            in_range = self._advance(segment, tier, metric, slots, local, buckets)
+            index = (buckets[in_range] % slots, local[in_range])
+            np.add.at(segment.arrays[(tier, metric, "sum")], index, delta[in_range].astype(np.float32))
+            np.add.at(segment.arrays[(tier, metric, "count")], index, (~rewritten[in_range]).astype(np.uint16))
+            np.maximum.at(segment.arrays[(tier, metric, "max")], index, codes[in_range])
+        return int(len(local))
+
+    @staticmethod
+    def _advance(segment: _Segment, tier: str, metric: str, slots: int,
+                 local: np.ndarray, buckets: np.ndarray) -> np.ndarray:
+        """
+        Move each series' head up to its newest bucket, clearing the slots it
+        skipped, and return a mask of the buckets still within retention
+        """
+        head = segment.arrays[(tier, metric, "head")]
+        fields = [array for (t, m, f), array in segment.arrays.items() if t == tier and m == metric and f != "head"]
+        series, inverse = np.unique(local, return_inverse=True)
+        newest = np.full(len(series), -1, dtype=np.int64)
+        np.maximum.at(newest, inverse, buckets)
+        current = head[series] - 1
+        gap = newest - current
+        # Series that had data and moved forward; a new series' slots are already empty
+        moved = (current >= 0) & (gap > 0)
+
+        whole = moved & (gap >= slots)
+        if whole.any():
+            for array in fields:
+                array[:, series[whole]] = 0
+        partial = moved & ~whole
+        for size in np.unique(gap[partial]):
+            columns = series[partial & (gap == size)]
+            starts = current[partial & (gap == size)] + 1
+            offsets = np.arange(size, dtype=np.int64)[:, None]
+            step = max(1, _CLEAR_CHUNK // int(size))
+            for begin in range(0, len(columns), step):
+                positions = (starts[None, begin:begin + step] + offsets) % slots
+                for array in fields:
+                    array[positions, columns[None, begin:begin + step]] = 0
+
+        advance = newest > current
+        head[series[advance]] = newest[advance] + 1
+        return buckets > head[local] - 1 - slots
+
+
+def mock_metric_samples(resource: Dict[str, Any], days: int = 14,
+                        end: Optional[float] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Synthesize 1-minute (timestamps, values) per metric around a resource's
+    current utilization, with a daily cycle and noise seeded from its id
+    """
+    end = end if end is not None else time.time()
+    minutes = days * 1440
+    times = (end // 60 - np.arange(minutes)[::-1]) * 60
+    rng = np.random.default_rng(zlib.crc32(resource["id"].encode()))
+    daily = np.sin(times * 2 * np.pi / 86400)
+    level = float(resource.get("utilization") or 0)
+    cpu = np.clip(level * (1 + 0.3 * daily) + rng.normal(0, 3, minutes), 0, 100)
+    memory = np.clip((10 + 0.8 * level) * (1 + 0.1 * daily) + rng.normal(0, 2, minutes), 0, 100)
+    response = np.maximum(80 + 4 * cpu + rng.normal(0, 15, minutes), 1)
+    return {"cpu": (times, cpu), "memory": (times, memory), "response_time_ms": (times, response)}
+
+
+metrics_store = MetricsStore()
+
+def seed_mock_history(resource_list: List[Dict[str, Any]], days: int = 14) -> int:
+    """Backfill synthetic history for resources that have none yet; returns how many were seeded"""
+    seeded = 0
+    for resource in resource_list:
+        if resource["id"] in metrics_store:
+            continue
+        for metric, (times, values) in mock_metric_samples(resource, days).items():
+            metrics_store.ingest(metric, [resource["id"]] * len(values), times, values)
+        seeded += 1
+    return seeded
+
+def ingest_metrics(metric: str, timestamp: Any, values: Dict[str, float]) -> int:
+    """
+    Record one sample per resource at a single timestamp.
+    Raises ValueError for a timestamp older than raw retention or too far ahead of now.
+    """
+    seconds = _epoch(timestamp)
+    earliest, latest = _accepted_range()
+    if seconds > latest:
+        raise ValueError(f"Timestamp is more than {MAX_CLOCK_SKEW_SECONDS}s in the future")
+    if not seconds > earliest:
+        raise ValueError(f"Timestamp is older than the {TIERS[RAW_TIER][1]}-day retention")
+    return metrics_store.ingest(metric, list(values), seconds, list(values.values()))
+
+def get_metric_series(resource_id: str, metric: str, start: Any = None, end: Any = None,
+                      resolution: Optional[str] = None) -> Dict[str, Any]:
+    """Return a resource's metric history; the default window is the 24 hours before end (or now)"""
+    end = _epoch(end) if end is not None else time.time()
+    start = _epoch(start) if start is not None else end - 86400
+    return metrics_store.series(metric, resource_id, start, end, resolution)
@@ -1,4 +1,7 @@
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Tuple
+import analytics
+import scenarios
+from store import IndexedStore
 
 mock_optimization_config = {
     "idle_resources_enabled": True,
@@ -51,50 +54,42 @@ mock_optimization_recommendations: List[Dict[str, Any]] = [
     }
 ]
 
+recommendation_store = IndexedStore(mock_optimization_recommendations, indexes=("status",))
+
 def calculate_savings(config: Dict[str, Any]) -> Dict[str, Any]:
-    """Calculate projected savings based on configuration"""
-    monthly_savings = 0
-    co2_reduction = 0
-    
-    if config.get("idle_resources_enabled", False):
-        monthly_savings += 245
-        co2_reduction += 0.8
-    
-    right_sizing = config.get("right_sizing_level", 0)
-    monthly_savings += (right_sizing / 100) * 400
-    co2_reduction += (right_sizing / 100) * 1.2
-    
-    if config.get("scheduling_enabled", False):
-        monthly_savings += 156
-        co2_reduction += 0.5
-    
-    auto_scaling = config.get("auto_scaling_level", 0)
-    monthly_savings += (auto_scaling / 100) * 300
-    co2_reduction += (auto_scaling / 100) * 0.9
-    
-    if config.get("storage_optimization_enabled", False):
-        monthly_savings += 89
-        co2_reduction += 0.3
-    
-    return {
-        "monthly": round(monthly_savings),
-        "yearly": round(monthly_savings * 12),
-        "co2_reduction": round(co2_reduction * 10) / 10,
-        "optimization_score": min(95, round((monthly_savings / 1190) * 100))
-    }
+    """Project savings for a configuration from the resource inventory, with the same model as the scenario sweep"""
+    return scenarios.project_config(config)
+
+def get_optimization_scenarios(step: int = 10, include_grid: bool = False) -> Dict[str, Any]:
+    """Evaluate the whole grid of configs and return the savings/CO2/risk Pareto frontier"""
+    return scenarios.sweep_scenarios(mock_optimization_config, step=step, include_grid=include_grid)
+
+def get_version() -> Tuple[int, int, int]:
+    """Version of get_optimization_data(): recommendations, config and the inventory behind projections"""
+    return recommendation_store.version, _config_version, analytics.resource_columns.version
 
 def get_optimization_data():
     """Get all optimization data including config, recommendations, and projections"""
     return {
         "config": mock_optimization_config,
-        "recommendations": mock_optimization_recommendations,
+        "recommendations": recommendation_store.all(),
         "projections": calculate_savings(mock_optimization_config)
     }
 
+_config_listeners: List[Callable[[Dict[str, Any]], None]] = []
+_config_version = 0
+
+def subscribe_config(callback: Callable[[Dict[str, Any]], None]):
+    """Register a callback invoked with the new config after every config update"""
+    _config_listeners.append(callback)
+
 def update_optimization_config(config: Dict[str, Any]):
     """Update optimization configuration"""
-    global mock_optimization_config
+    global mock_optimization_config, _config_version
     mock_optimization_config.update(config)
+    _config_version += 1
+    for callback in _config_listeners:
+        callback(mock_optimization_config)
     return {
         "config": mock_optimization_config,
         "projections": calculate_savings(mock_optimization_config)
@@ -102,15 +97,23 @@ def update_optimization_config(config: Dict[str, Any]):
 
 def apply_optimization(optimization_id: str):
     """Apply a specific optimization recommendation"""
-    for opt in mock_optimization_recommendations:
-        if opt["id"] == optimization_id:
-            opt["status"] = "Applied"
-            return {
-                "success": True,
-                "optimization": opt,
-                "message": f"Successfully applied optimization: {opt['title']}"
-            }
+    opt = recommendation_store.update(optimization_id, {"status": "Applied"})
+    if opt:
+        return {
+            "success": True,
+            "optimization": opt,
+            "message": f"Successfully applied optimization: {opt['title']}"
+        }
     return {
         "success": False,
         "message": "Optimization not found"
     }
+
+def apply_optimizations(optimization_ids: List[str]) -> List[Dict[str, Any]]:
+    """Apply many optimization recommendations in one locked pass, with a result per id"""
+    with recommendation_store.lock:
+        results = []
+        for optimization_id in optimization_ids:
+            result = apply_optimization(optimization_id)
+            results.append({"id": optimization_id, **result})
+        return results
@@ -1,6 +1,14 @@
 """
 Overview data for the ITOps dashboard
 """
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import optimization
+import resources
+import scenarios
 
 # Mock overview data structure
 mock_savings_data = {
@@ -81,12 +89,164 @@ mock_recommendations = [
     }
 ]
 
+# Recent activities kept in the view, newest first
+RECENT_ACTIVITY_LIMIT = 20
+# Months of savings history in chartData
+CHART_MONTHS = 6
+
+
+class OverviewView:
+    """
+    Materialized overview: savings run-rate, monthly chart buckets,
+    optimization count and recent activities.
+
+    Starts from the baseline figures and is adjusted by store listeners as
+    optimizations are applied (or un-applied) and resources are optimized,
+    so serving /overview never scans activities or optimizations. Each
+    change rebuilds a small, bounded response dict that reads return as is.
+    Savings are monthly run-rate amounts: the current month's chart bucket
+    tracks `monthly`, and a new month starts from the previous one.
+    """
+
+    def __init__(self, savings: Dict[str, Any], activities, recommendations):
+        self._lock = threading.Lock()
+        self._monthly = float(savings["monthly"])
+        self._co2 = float(savings["co2Reduced"])
+        self._total = int(savings["totalOptimizations"])
+        # Baseline chart values, dated to the months leading up to the first read
+        self._months = deque((None, float(point["savings"])) for point in savings["chartData"][-CHART_MONTHS:])
+        self._activities = deque(activities[:RECENT_ACTIVITY_LIMIT], maxlen=RECENT_ACTIVITY_LIMIT)
+        self._activity_count = len(activities)
+        self._recommendations = recommendations
+        self._current_month: Optional[tuple] = None
+        self._view: Optional[Dict[str, Any]] = None
+        # Bumped on every change; the month is part of the version since chartData rolls over
+        self.version = 0
+
+    def read(self) -> Dict[str, Any]:
+        """Return the current overview"""
+        view = self._view
+        if view is not None and self._current_month == _month_key(datetime.now(timezone.utc)):
+            return view
+        with self._lock:
+            self._roll_month(datetime.now(timezone.utc))
+            self._view = self._build()
+            return self._view
+
+    def on_recommendation_change(self, action: str, rec: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+        if action == "update":
+            before = previous
+        elif action == "insert":
+            before = None
+        else:
+            before, rec = rec, None
+        savings = _applied_savings(rec) - _applied_savings(before)
+        count = (_applied_savings(rec, None) is not None) - (_applied_savings(before, None) is not None)
+        if not savings and not count:
+            return
+        activity = None
+        if count > 0:
+            activity = {
+                "action": f"Optimization applied: {rec.get('title', rec['id'])}",
+                "resource": ", ".join(rec.get("resources") or []) or rec["id"],
+                "savings": rec.get("estimated_savings") or 0,
+                "type": "Cost"
+            }
+        self._apply(savings, count, activity)
+
+    def on_resource_change(self, action: str, resource: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+        if action != "update" or resource.get("status") != "Optimized":
+            return
+        savings = round((previous.get("monthly_cost") or 0) - (resource.get("monthly_cost") or 0), 2)
+        if savings <= 0:
+            return
+        self._apply(savings, 1, {
+            "action": f"{resource.get('type', 'Resource')} {resource['id']} optimized",
+            "resource": resource.get("name", resource["id"]),
+            "savings": savings,
+            "type": "Cost"
+        })
+
+    def _apply(self, savings: float, count: int, activity: Optional[Dict[str, Any]]) -> None:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self._roll_month(now)
+            self._monthly += savings
+            self._co2 += savings * scenarios.DEFAULT_CO2_TONNES_PER_DOLLAR
+            self._total += count
+            self._months[-1] = (self._months[-1][0], self._monthly)
+            self.version += 1
+            if activity is not None:
+                self._activity_count += 1
+                self._activities.appendleft({
+                    "id": f"act-{self._activity_count}",
+                    **activity,
+                    "timestamp": now.strftime("%Y-%m-%dT%H:%M:%SZ")
+                })
+            self._view = None
+
+    def _roll_month(self, now: datetime) -> None:
+        """Start a bucket for each month since the last change, carrying the run-rate forward"""
+        current = _month_key(now)
+        if self._current_month == current:
+            return
+        if self._current_month is None:
+            self._months = deque(
+                (_month_key(now, offset), value)
+                for offset, (_, value) in zip(range(1 - len(self._months), 1), self._months)
+            )
+        else:
+            year, month = self._current_month
+            while (year, month) < current:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                self._months.append(((year, month), self._monthly))
+        while len(self._months) > CHART_MONTHS:
+            self._months.popleft()
+        self._current_month = current
+        self._view = None
+
+    def _build(self) -> Dict[str, Any]:
+        return {
+            "savingsData": {
+                "monthly": round(self._monthly),
+                "yearly": round(self._monthly * 12),
+                "co2Reduced": round(self._co2, 1),
+                "totalOptimizations": self._total,
+                "chartData": [
+                    {"month": _month_label(key), "savings": round(value)}
+                    for key, value in self._months
+                ]
+            },
+            "activities": list(self._activities),
+            "recommendations": self._recommendations
+        }
+
+
+def _month_key(moment: datetime, offset: int = 0) -> tuple:
+    index = moment.year * 12 + moment.month - 1 + offset
+    return index // 12, index % 12 + 1
+
+
+def _month_label(key: tuple) -> str:
+    return datetime(key[0], key[1], 1).strftime("%b")
+
+
+def _applied_savings(rec: Optional[Dict[str, Any]], default: Any = 0) -> Any:
+    if rec is None or rec.get("status") != "Applied":
+        return default
+    return rec.get("estimated_savings") or 0
+
+
+overview_view = OverviewView(mock_savings_data, mock_activities, mock_recommendations)
+optimization.recommendation_store.subscribe(overview_view.on_recommendation_change)
+resources.resource_store.subscribe(overview_view.on_resource_change)
+
+def get_version() -> tuple:
+    """Version of get_all_overview_data()"""
+    return overview_view.version, *_month_key(datetime.now(timezone.utc))
+
 def get_all_overview_data():
     """
     Get all overview data
     """
-    return {
-        "savingsData": mock_savings_data,
-        "activities": mock_activities,
-        "recommendations": mock_recommendations
-    }
+    return overview_view.read()
@@ -1,10 +1,14 @@
-from typing import List, Dict, Any
+import base64
+import json
+from typing import List, Dict, Any, Optional
+from store import IndexedStore, SortedIndex
 
 mock_resources: List[Dict[str, Any]] = [
     {
         "id": "i-0123456789",
         "name": "web-server-1",
         "type": "EC2",
+        "instance_type": "t3.large",
         "status": "Running",
         "utilization": 15,
         "monthly_cost": 89.50,
@@ -22,6 +26,7 @@ mock_resources: List[Dict[str, Any]] = [
         "id": "prod-db",
         "name": "Production Database",
         "type": "RDS",
+        "instance_type": "db.r5.large",
         "status": "Running",
         "utilization": 67,
         "monthly_cost": 234.00,
@@ -52,15 +57,135 @@ mock_resources: List[Dict[str, Any]] = [
     }
 ]
 
+SORTABLE_FIELDS = ("id", "monthly_cost", "utilization")
+# Filters matching at most this many resources are paged by sorting just the
+# matches; larger ones walk the store's sorted index and skip non-matches
+SMALL_FILTER_SIZE = 1024
+
+resource_store = IndexedStore(
+    mock_resources,
+    indexes=("type", "region", "provider", "status"),
+    sorted_indexes=SORTABLE_FIELDS
+)
+
 def get_all_resources():
-    return mock_resources
+    return resource_store.all()
 
 def get_resource_by_id(resource_id: str):
-    return next((resource for resource in mock_resources if resource["id"] == resource_id), None)
+    return resource_store.get(resource_id)
+
+def find_resources(type: Optional[str] = None, region: Optional[str] = None,
+                   provider: Optional[str] = None, status: Optional[str] = None):
+    return resource_store.find(type=type, region=region, provider=provider, status=status)
+
+def query_resources(type: Optional[str] = None, region: Optional[str] = None,
+                    provider: Optional[str] = None, status: Optional[str] = None,
+                    min_utilization: Optional[float] = None, max_utilization: Optional[float] = None,
+                    sort_by: Optional[str] = None, order: str = "asc", cursor: Optional[str] = None,
+                    limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Filter, sort and paginate resources on the server
+
+    Pagination is keyset based: the cursor encodes the (sort value, id) of the
+    last item returned, so pages never repeat or skip resources whose sort
+    value is unchanged, even when other resources are updated in between.
+    Unpaginated, unsorted queries keep insertion order; paginated ones sort
+    by id unless told otherwise.
+    Raises ValueError for an unknown sort field, order or a malformed cursor.
+    """
+    if sort_by is None:
+        if limit is None and cursor is None:
+            items = [r for r in find_resources(type=type, region=region, provider=provider, status=status)
+                     if _in_utilization_range(r, min_utilization, max_utilization)]
+            return {"items": items, "next_cursor": None, "count": len(items)}
+        sort_by = "id"
+    if sort_by not in SORTABLE_FIELDS:
+        raise ValueError(f"Cannot sort by '{sort_by}'. Use one of: {', '.join(SORTABLE_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+    after = _decode_cursor(cursor, sort_by, order) if cursor else None
+    has_range = min_utilization is not None or max_utilization is not None
+
+    with resource_store.lock:
+        matched, matches = resource_store.membership(type=type, region=region, provider=provider, status=status)
+        if matched <= SMALL_FILTER_SIZE:
+            candidates = find_resources(type=type, region=region, provider=provider, status=status)
+            index = SortedIndex((r.get(sort_by), r["id"]) for r in candidates if r.get(sort_by) is not None)
+        else:
+            index = resource_store.sorted_index(sort_by)
+
+        items = []
+        for _, resource_id in index.scan(after, descending=(order == "desc")):
+            if not matches(resource_id):
+                continue
+            resource = resource_store.get(resource_id)
+            if has_range and not _in_utilization_range(resource, min_utilization, max_utilization):
+                continue
+            items.append(resource)
+            if limit is not None and len(items) > limit:
+                break
+
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = _encode_cursor(last[sort_by], last["id"], sort_by, order)
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "count": len(items)
+    }
+
+def _in_utilization_range(resource: Dict[str, Any], low: Optional[float], high: Optional[float]) -> bool:
+    if low is None and high is None:
+        return True
+    utilization = resource.get("utilization")
+    if utilization is None:
+        return False
+    return (low is None or utilization >= low) and (high is None or utilization <= high)
+
+def _encode_cursor(value: Any, resource_id: str, sort_by: str, order: str) -> str:
+    payload = json.dumps([value, resource_id, sort_by, order], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str, sort_by: str, order: str):
+    try:
+        value, resource_id, cursor_sort, cursor_order = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed cursor")
+    if cursor_sort != sort_by or cursor_order != order:
+        raise ValueError("Cursor does not match the requested sort")
+    if sort_by == "id":
+        valid_value = isinstance(value, str)
+    else:
+        valid_value = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if not valid_value or not isinstance(resource_id, str):
+        raise ValueError("Malformed cursor")
+    return (value, resource_id)
 
 def update_resource(resource_id: str, updates: Dict[str, Any]):
-    for resource in mock_resources:
-        if resource["id"] == resource_id:
-            resource.update(updates)
-            return resource
-    return None
+    return resource_store.update(resource_id, updates)
+
+def optimize_resource(resource_id: str, cost_factor: float = 0.7):
+    """Mark a resource optimized and scale its monthly cost in a single locked lookup"""
+    with resource_store.lock:
+        resource = resource_store.get(resource_id)
+        if not resource:
+            return None
+        return resource_store.update(resource_id, {
+            "status": "Optimized",
+            "monthly_cost": round(resource["monthly_cost"] * cost_factor, 2)
+        })
+
+def optimize_resources(resource_ids: List[str], cost_factor: float = 0.7) -> List[Dict[str, Any]]:
+    """Optimize many resources in one locked pass, with a result per id"""
+    with resource_store.lock:
+        results = []
+        for resource_id in resource_ids:
+            resource = optimize_resource(resource_id, cost_factor)
+            if resource:
+                results.append({"id": resource_id, "success": True, "resource": resource})
+            else:
+                results.append({"id": resource_id, "success": False, "error": "Resource not found"})
+        return results
@@ -0,0 +1,299 @@
+"""
+Fleet-wide right-sizing from utilization history percentiles and a local price table
+"""
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+import resources
+
+HOURS_PER_MONTH = 730
+PERCENTILES = (50, 95, 99)
+
+# Recommended capacity keeps p95 CPU and p99 memory below these shares of the new size
+CPU_TARGET_UTILIZATION = 0.7
+MEMORY_TARGET_UTILIZATION = 0.8
+# Only recommend a change worth at least this much per month
+MIN_MONTHLY_SAVINGS = 1.0
+# Resources are evaluated this many at a time to bound the history matrices
+CHUNK_SIZE = 8192
+
+# On-demand (vCPU, memory GiB, hourly USD) per instance type, grouped by resource type
+INSTANCE_PRICES: Dict[str, Dict[str, Tuple[float, float, float]]] = {
+    "EC2": {
+        "t3.nano": (2, 0.5, 0.0052),
+        "t3.micro": (2, 1, 0.0104),
+        "t3.small": (2, 2, 0.0208),
+        "t3.medium": (2, 4, 0.0416),
+        "t3.large": (2, 8, 0.0832),
+        "t3.xlarge": (4, 16, 0.1664),
+        "c5.large": (2, 4, 0.085),
+        "c5.xlarge": (4, 8, 0.17),
+        "m5.large": (2, 8, 0.096),
+        "m5.xlarge": (4, 16, 0.192),
+        "m5.2xlarge": (8, 32, 0.384),
+        "r5.large": (2, 16, 0.126),
+        "r5.xlarge": (4, 32, 0.252)
+    },
+    "RDS": {
+        "db.t3.micro": (2, 1, 0.017),
+        "db.t3.small": (2, 2, 0.034),
+        "db.t3.medium": (2, 4, 0.068),
+        "db.t3.large": (2, 8, 0.136),
+        "db.m5.large": (2, 8, 0.171),
+        "db.m5.xlarge": (4, 16, 0.342),
+        "db.r5.large": (2, 16, 0.25),
+        "db.r5.xlarge": (4, 32, 0.5)
+    },
+    "Compute Engine": {
+        "e2-micro": (2, 1, 0.0084),
+        "e2-small": (2, 2, 0.0168),
+        "e2-medium": (2, 4, 0.0335),
+        "e2-standard-2": (2, 8, 0.067),
+        "e2-standard-4": (4, 16, 0.134),
+        "n2-standard-2": (2, 8, 0.0971),
+        "n2-standard-4": (4, 16, 0.1942)
+    },
+    "Virtual Machine": {
+        "B1s": (1, 1, 0.0104),
+        "B1ms": (1, 2, 0.0207),
+        "B2s": (2, 4, 0.0416),
+        "B2ms": (2, 8, 0.0832),
+        "D2s_v3": (2, 8, 0.096),
+        "D4s_v3": (4, 16, 0.192)
+    }
+}
+
+# CLI flags that set the instance size in a resource's remediation commands
+SIZE_FLAG = re.compile(r"(--(?:instance-type|db-instance-class|machine-type|size)[ =])(\S+)")
+
+HistorySource = Callable[[List[Dict[str, Any]]], Tuple[np.ndarray, np.ndarray]]
+
+
+def utilization_percentiles(samples: np.ndarray, percentiles: Sequence[float] = PERCENTILES) -> np.ndarray:
+    """
+    Row-wise percentiles of a (resources, samples) matrix, shaped
+    (resources, len(percentiles)); NaN marks missing samples, and rows
+    without any sample get NaN percentiles
+    """
+    if samples.size == 0:
+        return np.full((len(samples), len(percentiles)), np.nan)
+    missing = np.isnan(samples)
+    if not missing.any():
+        return np.percentile(samples, percentiles, axis=1).T
+    result = np.full((len(samples), len(percentiles)), np.nan)
+    observed = ~missing.all(axis=1)
+    if observed.any():
+        result[observed] = np.nanpercentile(samples[observed], percentiles, axis=1).T
+    return result
+
+
+class _Catalog:
+    """One resource type's instance types as arrays sorted by price"""
+
+    def __init__(self, prices: Dict[str, Tuple[float, float, float]]):
+        ordered = sorted(prices.items(), key=lambda item: item[1][2])
+        self.names = [name for name, _ in ordered]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.vcpu = np.array([spec[0] for _, spec in ordered], dtype=np.float64)
+        self.memory = np.array([spec[1] for _, spec in ordered], dtype=np.float64)
+        self.hourly = np.array([spec[2] for _, spec in ordered], dtype=np.float64)
+
+    def cheapest_fit(self, vcpu: np.ndarray, memory: np.ndarray) -> np.ndarray:
+        """Position of the cheapest type meeting each requirement, or -1"""
+        fits = (self.vcpu[None, :] >= vcpu[:, None]) & (self.memory[None, :] >= memory[:, None])
+        return np.where(fits.any(axis=1), fits.argmax(axis=1), -1)
+
+
+class RightsizingEngine:
+    """
+    Computes right-sizing for the whole fleet in one batch.
+
+    Utilization history for a chunk of resources arrives as (resources,
+    samples) matrices, so p50/p95/p99 CPU and memory come from a single
+    percentile call per chunk. The capacity each resource actually needs is
+    its current vCPU and memory scaled by p95 CPU and p99 memory over the
+    target utilization; the cheapest instance type of the same resource type
+    that covers both is then picked with one broadcast comparison against
+    the price-sorted catalog.
+    """
+
+    def __init__(self, store, history_source: HistorySource = metrics.metrics_store.utilization_history,
+                 prices: Dict[str, Dict[str, Tuple[float, float, float]]] = INSTANCE_PRICES):
+        """
+        Initialize the engine
+
+        Args:
+            store: Resource store to read the fleet from and write results to
+            history_source: Returns (cpu, memory) utilization matrices for a list of resources
+            prices: Instance types per resource type, as (vCPU, memory GiB, hourly USD)
+        """
+        self._store = store
+        self.history_source = history_source
+        self._catalogs = {resource_type: _Catalog(types) for resource_type, types in prices.items()}
+        self._lock = threading.Lock()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._last_run: Optional[Dict[str, Any]] = None
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Recompute right-sizing for every sized resource and write
+        recommendations and estimated_savings back to the store
+
+        Returns:
+            Summary of the run
+        """
+        started = time.perf_counter()
+        with self._lock:
+            fleet = [r for r in self._store.all() if self._is_sized(r)]
+            results: Dict[str, Dict[str, Any]] = {}
+            for start in range(0, len(fleet), CHUNK_SIZE):
+                chunk = fleet[start:start + CHUNK_SIZE]
+                cpu, memory = self.history_source(chunk)
+                cpu_pct, memory_pct = utilization_percentiles(cpu), utilization_percentiles(memory)
+                for resource_type, rows in _group_rows(chunk).items():
+                    results.update(self._size(self._catalogs[resource_type], [chunk[i] for i in rows],
+                                              cpu_pct[rows], memory_pct[rows]))
+
+            with self._store.lock:
+                for resource_id, result in results.items():
+                    resource = self._store.get(resource_id)
+                    if resource is None:
+                        continue
+                    updates = _resource_updates(resource, result)
+                    if any(resource.get(field) != value for field, value in updates.items()):
+                        self._store.update(resource_id, updates)
+            self._results = results
+            self._last_run = {
+                "completed_at": time.time(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "resources_evaluated": len(results),
+                "resources_without_history": sum(1 for r in results.values() if r["recommended_type"] is None),
+                "rightsizing_opportunities": sum(1 for r in results.values() if r["estimated_savings"] > 0),
+                "undersized": sum(1 for r in results.values() if r["action"] == "upsize"),
+                "total_estimated_savings": round(sum(r["estimated_savings"] for r in results.values()), 2)
+            }
+            return self._last_run
+
+    def results(self, min_savings: float = 0.0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Return the last run's per-resource results, largest savings first"""
+        items = sorted(
+            (r for r in self._results.values() if r["estimated_savings"] >= min_savings),
+            key=lambda r: -r["estimated_savings"]
+        )
+        return {
+            "summary": self._last_run,
+            "items": items[:limit] if limit is not None else items
+        }
+
+    def _is_sized(self, resource: Dict[str, Any]) -> bool:
+        catalog = self._catalogs.get(resource.get("type"))
+        return catalog is not None and resource.get("instance_type") in catalog.positions
+
+    def _size(self, catalog: _Catalog, fleet: List[Dict[str, Any]],
+              cpu_pct: np.ndarray, memory_pct: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        current = np.array([catalog.positions[r["instance_type"]] for r in fleet])
+        has_history = ~np.isnan(cpu_pct[:, 1]) & ~np.isnan(memory_pct[:, 1])
+        needed_vcpu = catalog.vcpu[current] * np.nan_to_num(cpu_pct[:, 1]) / 100 / CPU_TARGET_UTILIZATION
+        needed_memory = catalog.memory[current] * np.nan_to_num(memory_pct[:, 2]) / 100 / MEMORY_TARGET_UTILIZATION
+        best = catalog.cheapest_fit(needed_vcpu, needed_memory)
+        # Nothing in the catalog is big enough: fall back to the largest type
+        best = np.where(best >= 0, best, int(np.argmax(catalog.vcpu * catalog.memory)))
+        monthly = np.round(catalog.hourly * HOURS_PER_MONTH, 2)
+        savings = np.where(has_history, monthly[current] - monthly[best], 0.0)
+
+        # Convert to Python values in bulk; per-element NumPy access dominates otherwise
+        cpu_rows, memory_rows = _percentile_rows(cpu_pct), _percentile_rows(memory_pct)
+        results = {}
+        for i, (resource, position, saving, history) in enumerate(
+                zip(fleet, best.tolist(), savings.tolist(), has_history.tolist())):
+            recommended = catalog.names[position] if history else None
+            if recommended is None or recommended == resource["instance_type"]:
+                action = "keep"
+            elif saving >= MIN_MONTHLY_SAVINGS:
+                action = "downsize"
+            elif saving < 0:
+                action = "upsize"
+            else:
+                # A different type at about the same price is not worth a migration
+                action = "keep"
+            results[resource["id"]] = {
+                "id": resource["id"],
+                "type": resource.get("type"),
+                "current_type": resource["instance_type"],
+                "recommended_type": recommended,
+                "action": action,
+                "cpu": cpu_rows[i],
+                "memory": memory_rows[i],
+                "current_monthly_cost": float(monthly[catalog.positions[resource["instance_type"]]]),
+                "recommended_monthly_cost": float(monthly[position]) if recommended else None,
+                "estimated_savings": round(saving, 2) if action == "downsize" else 0.0
+            }
+        return results
+
+
+def _group_rows(fleet: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    groups: Dict[str, List[int]] = {}
+    for i, resource in enumerate(fleet):
+        groups.setdefault(resource["type"], []).append(i)
+    return groups
+
+
+def _percentile_rows(values: np.ndarray) -> List[Dict[str, Optional[float]]]:
+    names = [f"p{p}" for p in PERCENTILES]
+    return [
+        {name: None if value != value else value for name, value in zip(names, row)}
+        for row in np.round(values, 1).tolist()
+    ]
+
+
+def _is_rightsizing_text(text: str) -> bool:
+    return text.startswith(("Right-size to ", "Upsize to "))
+
+
+def _resource_updates(resource: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace a resource's previous right-sizing advice and resize commands with the new result"""
+    advice = [text for text in resource.get("recommendations") or [] if not _is_rightsizing_text(text)]
+    if result["action"] == "downsize":
+        advice.insert(0, f"Right-size to {result['recommended_type']} "
+                         f"(p95 CPU {result['cpu']['p95']}%, save ${result['estimated_savings']:,.2f}/month)")
+    elif result["action"] == "upsize":
+        advice.insert(0, f"Upsize to {result['recommended_type']} (p95 CPU {result['cpu']['p95']}%, "
+                         f"p99 memory {result['memory']['p99']}%)")
+    updates = {"recommendations": advice, "estimated_savings": result["estimated_savings"]}
+    if resource.get("commands") and result["recommended_type"] is not None:
+        updates["commands"] = _resize_commands(resource["commands"], result)
+    return updates
+
+
+def _resize_commands(commands: List[Dict[str, Any]], result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Point commands that set an instance size at the recommended type, or
+    mark them stale when the result advises no resize
+    """
+    resize = result["action"] in ("downsize", "upsize")
+    updated = []
+    for command in commands:
+        text = command.get("command") or ""
+        if not SIZE_FLAG.search(text):
+            updated.append(command)
+        elif resize:
+            command = {key: value for key, value in command.items() if key != "stale"}
+            updated.append(dict(command, command=SIZE_FLAG.sub(
+                lambda match: match.group(1) + result["recommended_type"], text)))
+        else:
+            updated.append(dict(command, stale=True))
+    return updated
+
+
+rightsizing_engine = RightsizingEngine(resources.resource_store)
+
+def run_rightsizing() -> Dict[str, Any]:
+    return rightsizing_engine.run()
+
+def get_rightsizing(min_savings: float = 0.0, limit: Optional[int] = None) -> Dict[str, Any]:
+    return rightsizing_engine.results(min_savings=min_savings, limit=limit)
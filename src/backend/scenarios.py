@@ -0,0 +1,256 @@
+"""
+Vectorized what-if evaluation of optimization configs over the resource inventory
+"""
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+import analytics
+
+LEVERS = ("right_sizing_level", "auto_scaling_level", "scheduling_enabled", "storage_optimization_enabled")
+TOGGLES = ("idle_resources_enabled", "scheduling_enabled", "storage_optimization_enabled")
+
+RIGHTSIZABLE_TYPES = {"EC2", "RDS", "Compute Engine", "Virtual Machine", "Cloud SQL"}
+SCALABLE_TYPES = {"EC2", "Compute Engine", "Virtual Machine"}
+SCHEDULABLE_TYPES = {"EC2", "RDS", "Compute Engine", "Virtual Machine"}
+STORAGE_TYPES = {"S3", "EBS", "Cloud Storage", "Blob Storage"}
+
+# Right-sizing aims for this utilization and never more than halves a resource
+RIGHT_SIZING_TARGET = 0.6
+RIGHT_SIZING_MAX_REDUCTION = 0.5
+# Auto-scaling reclaims this share of capacity unused at its target utilization
+AUTO_SCALING_TARGET = 0.75
+AUTO_SCALING_CAPTURE = 0.4
+# Share of a schedulable resource's cost saved by stopping dev/test capacity off-hours
+SCHEDULING_SAVINGS_SHARE = 0.2
+# Share of storage cost saved by moving cold data to archive tiers
+STORAGE_ARCHIVE_SAVINGS = 0.45
+
+# Tonnes of CO2e avoided per dollar of monthly spend removed
+CO2_TONNES_PER_DOLLAR = {"compute": 0.0025, "database": 0.002, "storage": 0.0006}
+DEFAULT_CO2_TONNES_PER_DOLLAR = 0.0015
+DATABASE_TYPES = {"RDS", "Cloud SQL", "DynamoDB"}
+
+# Performance/availability risk per dollar affected by each lever (scaled to 0-100 of total spend)
+IDLE_STOP_RISK = 0.2
+RIGHT_SIZING_RISK = 1.0
+AUTO_SCALING_RISK = 0.5
+SCHEDULING_RISK = 0.5
+STORAGE_ARCHIVE_RISK = 0.3
+
+# Savings as a share of the best achievable, capped like the original score
+MAX_OPTIMIZATION_SCORE = 95
+
+
+class ScenarioModel:
+    """
+    Projects savings, CO2 reduction and risk for any number of optimization
+    configs in one vectorized step.
+
+    Each resource gets a potential per lever (right-sizing headroom,
+    auto-scaling slack, scheduling and archiving shares). Levers compound on
+    the cost the previous ones leave, so a resource's savings are
+    cost * (1 - prod(1 - level_k * potential_k)). Expanding that product by
+    inclusion-exclusion turns it into a fixed set of per-subset sums over the
+    inventory, computed once per inventory version; every scenario is then
+    a small dot product with those sums. Idle resources form their own
+    partition because stopping them replaces every other lever.
+    """
+
+    def __init__(self, columns: analytics.ResourceColumns):
+        self._columns = columns
+        self._lock = threading.Lock()
+        self._sums: Dict[Tuple[int, float], Dict[str, Any]] = {}
+
+    def evaluate(self, levels: np.ndarray, idle_threshold: float = 5.0) -> Dict[str, np.ndarray]:
+        """
+        Evaluate scenarios given as rows of
+        (idle_enabled, right_sizing, auto_scaling, scheduling, storage), each in [0, 1]
+
+        Returns:
+            Arrays of monthly savings, CO2 reduction (tonnes/month) and risk (0-100)
+        """
+        sums = self._lever_sums(idle_threshold)
+        idle_on = levels[:, 0]
+        lever_levels = levels[:, 1:]
+
+        # Signed product of the levels in each lever subset, one column per subset
+        subsets = sums["subsets"]
+        terms = np.ones((len(levels), len(subsets)))
+        for column, members in enumerate(subsets):
+            for lever in members:
+                terms[:, column] *= lever_levels[:, lever]
+            terms[:, column] *= -1 if len(members) % 2 == 0 else 1
+
+        savings = terms @ sums["active_cost"] + np.where(idle_on > 0, sums["idle_cost"], terms @ sums["idle_lever_cost"])
+        co2 = terms @ sums["active_co2"] + np.where(idle_on > 0, sums["idle_co2"], terms @ sums["idle_lever_co2"])
+        risk = (lever_levels @ sums["active_risk"]
+                + np.where(idle_on > 0, IDLE_STOP_RISK * sums["idle_cost"], lever_levels @ sums["idle_lever_risk"]))
+        total = sums["total_cost"]
+        return {
+            "monthly": savings,
+            "co2_reduction": co2,
+            "risk": 100 * risk / total if total else np.zeros(len(levels))
+        }
+
+    def _lever_sums(self, idle_threshold: float) -> Dict[str, Any]:
+        with self._lock:
+            cached = self._sums.get((self._columns.version, idle_threshold))
+            if cached is not None:
+                return cached
+        version, cost, utilization, codes, labels = self._columns.snapshot("type")
+        key = (version, idle_threshold)
+
+        types = np.array(labels, dtype=object)[codes] if len(labels) else np.array([], dtype=object)
+        in_types = lambda names: np.isin(types, list(names))
+        usage = np.nan_to_num(utilization.astype(np.float64) / 100, nan=1.0)
+        idle = ~np.isnan(utilization) & (utilization < idle_threshold)
+
+        potentials = np.stack([
+            np.clip(1 - usage / RIGHT_SIZING_TARGET, 0, RIGHT_SIZING_MAX_REDUCTION) * in_types(RIGHTSIZABLE_TYPES),
+            np.clip(1 - usage / AUTO_SCALING_TARGET, 0, 1) * AUTO_SCALING_CAPTURE * in_types(SCALABLE_TYPES),
+            SCHEDULING_SAVINGS_SHARE * in_types(SCHEDULABLE_TYPES),
+            STORAGE_ARCHIVE_SAVINGS * in_types(STORAGE_TYPES)
+        ], axis=1)
+        risk_weights = np.stack([
+            potentials[:, 0] * RIGHT_SIZING_RISK * np.minimum(usage / RIGHT_SIZING_TARGET, 1),
+            potentials[:, 1] * AUTO_SCALING_RISK,
+            potentials[:, 2] * SCHEDULING_RISK,
+            potentials[:, 3] * STORAGE_ARCHIVE_RISK
+        ], axis=1)
+        intensity = np.full(len(cost), DEFAULT_CO2_TONNES_PER_DOLLAR)
+        intensity[in_types(SCALABLE_TYPES)] = CO2_TONNES_PER_DOLLAR["compute"]
+        intensity[in_types(DATABASE_TYPES)] = CO2_TONNES_PER_DOLLAR["database"]
+        intensity[in_types(STORAGE_TYPES)] = CO2_TONNES_PER_DOLLAR["storage"]
+
+        # Product of potentials for every non-empty lever subset
+        subsets = [tuple(lever for lever in range(len(LEVERS)) if mask >> lever & 1)
+                   for mask in range(1, 1 << len(LEVERS))]
+        products = np.ones((len(cost), len(subsets)))
+        for column, members in enumerate(subsets):
+            for lever in members:
+                products[:, column] *= potentials[:, lever]
+
+        active_cost, idle_cost = cost * ~idle, cost * idle
+        sums = {
+            "subsets": subsets,
+            "total_cost": float(cost.sum()),
+            "active_cost": active_cost @ products,
+            "active_co2": (active_cost * intensity) @ products,
+            "idle_lever_cost": idle_cost @ products,
+            "idle_lever_co2": (idle_cost * intensity) @ products,
+            "idle_cost": float(idle_cost.sum()),
+            "idle_co2": float((idle_cost * intensity).sum()),
+            "active_risk": active_cost @ risk_weights,
+            "idle_lever_risk": idle_cost @ risk_weights,
+            "resource_count": int(len(cost))
+        }
+        with self._lock:
+            self._sums = {key: sums}
+        return sums
+
+
+def _config_row(config: Dict[str, Any]) -> List[float]:
+    return [
+        1.0 if config.get("idle_resources_enabled") else 0.0,
+        float(config.get("right_sizing_level", 0)) / 100,
+        float(config.get("auto_scaling_level", 0)) / 100,
+        1.0 if config.get("scheduling_enabled") else 0.0,
+        1.0 if config.get("storage_optimization_enabled") else 0.0
+    ]
+
+
+# Every lever fully on; optimization_score is savings relative to this config
+ALL_LEVERS_ROW = [1.0, 1.0, 1.0, 1.0, 1.0]
+
+
+def _config_dict(levels: Sequence[float]) -> Dict[str, Any]:
+    return {
+        "idle_resources_enabled": bool(levels[0]),
+        "right_sizing_level": int(round(levels[1] * 100)),
+        "auto_scaling_level": int(round(levels[2] * 100)),
+        "scheduling_enabled": bool(levels[3]),
+        "storage_optimization_enabled": bool(levels[4])
+    }
+
+
+def _scenario(levels: Sequence[float], result: Dict[str, np.ndarray], index: int, best: float) -> Dict[str, Any]:
+    monthly = float(result["monthly"][index])
+    return {
+        "config": _config_dict(levels),
+        "monthly": round(monthly),
+        "yearly": round(monthly * 12),
+        "co2_reduction": round(float(result["co2_reduction"][index]), 2),
+        "risk": round(float(result["risk"][index]), 1),
+        "optimization_score": min(MAX_OPTIMIZATION_SCORE, round(monthly / best * 100)) if best > 0 else 0
+    }
+
+
+def pareto_frontier(savings: np.ndarray, co2: np.ndarray, risk: np.ndarray, chunk: int = 1024) -> np.ndarray:
+    """
+    Return a mask of scenarios no other scenario beats on every objective
+    (higher savings, higher CO2 reduction, lower risk). Of scenarios with
+    identical outcomes only the first is kept.
+    """
+    points = np.round(np.stack([savings, co2, -risk], axis=1), 6)
+    _, first = np.unique(points, axis=0, return_index=True)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[first] = True
+    candidates = points[keep]
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk, None, :]
+        no_worse = (candidates[None, :, :] >= block).all(axis=2)
+        better = (candidates[None, :, :] > block).any(axis=2)
+        keep[start:start + chunk] &= ~(no_worse & better).any(axis=1)
+    return keep
+
+
+def sweep_scenarios(current_config: Dict[str, Any], step: int = 10, idle_threshold: float = 5.0,
+                    include_grid: bool = False) -> Dict[str, Any]:
+    """
+    Evaluate every combination of right-sizing and auto-scaling level (in
+    steps of `step` percent) and lever toggle, and return the Pareto
+    frontier of savings, CO2 reduction and risk
+    """
+    levels = np.arange(0, 101, step) / 100
+    toggles = np.array([0.0, 1.0])
+    idle, right_sizing, auto_scaling, scheduling, storage = np.meshgrid(
+        toggles, levels, levels, toggles, toggles, indexing="ij"
+    )
+    grid = np.stack([idle.ravel(), right_sizing.ravel(), auto_scaling.ravel(), scheduling.ravel(), storage.ravel()], axis=1)
+    rows = np.vstack([grid, [ALL_LEVERS_ROW]])
+
+    result = scenario_model.evaluate(rows, idle_threshold)
+    best = float(result["monthly"][-1])
+    on_frontier = np.flatnonzero(pareto_frontier(
+        result["monthly"][:-1], result["co2_reduction"][:-1], result["risk"][:-1]
+    ))
+    frontier = sorted(
+        (_scenario(rows[i], result, i, best) for i in on_frontier),
+        key=lambda s: (s["monthly"], s["co2_reduction"])
+    )
+    response = {
+        "step": step,
+        "scenario_count": len(grid),
+        "current": {"config": _config_dict(_config_row(current_config)),
+                    **project_config(current_config, idle_threshold)},
+        "frontier": frontier
+    }
+    if include_grid:
+        response["scenarios"] = [_scenario(rows[i], result, i, best) for i in range(len(grid))]
+    return response
+
+
+def project_config(config: Dict[str, Any], idle_threshold: float = 5.0) -> Dict[str, Any]:
+    """
+    Project savings, CO2 reduction and risk for a single config. This is the
+    one projection behind both GET /optimization and the sweep's "current".
+    """
+    result = scenario_model.evaluate(np.array([_config_row(config), ALL_LEVERS_ROW]), idle_threshold)
+    projection = _scenario(_config_row(config), result, 0, float(result["monthly"][1]))
+    del projection["config"]
+    return projection
+
+
+scenario_model = ScenarioModel(analytics.resource_columns)
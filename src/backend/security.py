@@ -1,4 +1,10 @@
 # Mock data for Security features
+import time
+from typing import Any, Dict, List, Tuple
+
+import keys
+from compliance import FRAMEWORK_KEYS, ComplianceCoverage
+from store import IndexedStore
 
 mock_security_findings = [
     {
@@ -55,41 +61,6 @@ mock_security_findings = [
     }
 ]
 
-mock_security_keys = [
-    {
-        "id": "key-1",
-        "name": "AWS API Key - Production",
-        "type": "API Key",
-        "lastUsed": "2024-01-10T14:30:00Z",
-        "expiresIn": 15,
-        "status": "Active"
-    },
-    {
-        "id": "key-2",
-        "name": "GitHub Deploy Key",
-        "type": "SSH Key",
-        "lastUsed": "2023-12-20T08:15:00Z",
-        "expiresIn": -5,
-        "status": "Expired"
-    },
-    {
-        "id": "key-3",
-        "name": "Service Account - Monitoring",
-        "type": "Service Account",
-        "lastUsed": "2023-10-15T12:00:00Z",
-        "expiresIn": 90,
-        "status": "Unused"
-    },
-    {
-        "id": "key-4",
-        "name": "SSL Certificate",
-        "type": "Certificate",
-        "lastUsed": "2024-01-15T10:00:00Z",
-        "expiresIn": 45,
-        "status": "Active"
-    }
-]
-
 mock_security_score = {
     "current": 78,
     "previous": 75,
@@ -112,14 +83,6 @@ mock_security_score = {
     ]
 }
 
-mock_compliance_coverage = {
-    "soc2": 85,
-    "iso27001": 78,
-    "gdpr": 92,
-    "hipaa": 68,
-    "cisBenchmark": 81
-}
-
 mock_security_recommendations = [
     {
         "id": "rec-1",
@@ -144,40 +107,79 @@ mock_security_recommendations = [
     }
 ]
 
+# Index bucket sizes double as severity/status counters, so summaries never scan the findings
+finding_store = IndexedStore(
+    mock_security_findings,
+    indexes=("severity", "status", "resource"),
+    multi_indexes=("compliance",)
+)
+
+# Framework coverage follows finding status changes through a store listener
+compliance_coverage = ComplianceCoverage(finding_store)
+
+def get_findings_summary() -> Dict[str, int]:
+    """Return finding counts by severity and status"""
+    return {
+        "critical": finding_store.count("severity", "Critical"),
+        "high": finding_store.count("severity", "High"),
+        "medium": finding_store.count("severity", "Medium"),
+        "low": finding_store.count("severity", "Low"),
+        "open": finding_store.count("status", "Open"),
+        "in_progress": finding_store.count("status", "In Progress"),
+        "fixed": finding_store.count("status", "Fixed")
+    }
+
 def get_all_findings():
     """Return all security findings with summary"""
-    summary = {
-        "critical": sum(1 for f in mock_security_findings if f["severity"] == "Critical"),
-        "high": sum(1 for f in mock_security_findings if f["severity"] == "High"),
-        "medium": sum(1 for f in mock_security_findings if f["severity"] == "Medium"),
-        "low": sum(1 for f in mock_security_findings if f["severity"] == "Low"),
-        "open": sum(1 for f in mock_security_findings if f["status"] == "Open"),
-        "in_progress": sum(1 for f in mock_security_findings if f["status"] == "In Progress"),
-        "fixed": sum(1 for f in mock_security_findings if f["status"] == "Fixed")
-    }
-    
     return {
-        "findings": mock_security_findings,
-        "summary": summary
+        "findings": finding_store.all(),
+        "summary": get_findings_summary()
     }
 
+def query_findings(severity: str = None, status: str = None, resource: str = None,
+                   framework: str = None) -> List[Dict[str, Any]]:
+    """Return findings matching every given filter; framework matches any listed compliance framework"""
+    return finding_store.find(severity=severity, status=status, resource=resource, compliance=framework)
+
 def get_finding_by_id(finding_id: str):
     """Return a specific finding by ID"""
-    return next((f for f in mock_security_findings if f["id"] == finding_id), None)
+    return finding_store.get(finding_id)
+
+def _check_compliance(updates: Dict[str, Any]) -> None:
+    """Raise ValueError unless an updated compliance value is a list of known framework names"""
+    if "compliance" not in updates:
+        return
+    frameworks = updates["compliance"]
+    if not isinstance(frameworks, list) or not all(isinstance(name, str) and name in FRAMEWORK_KEYS
+                                                   for name in frameworks):
+        raise ValueError(f"'compliance' must be a list of: {', '.join(FRAMEWORK_KEYS)}")
 
 def update_finding(finding_id: str, updates: dict):
-    """Update a finding with new data"""
-    for finding in mock_security_findings:
-        if finding["id"] == finding_id:
-            finding.update(updates)
-            return finding
-    return None
+    """Update a finding with new data; raises ValueError for an invalid compliance list"""
+    _check_compliance(updates)
+    return finding_store.update(finding_id, updates)
+
+def update_findings(finding_ids: List[str], updates: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply the same updates to many findings in one locked pass, with a result per id"""
+    _check_compliance(updates)
+    return [
+        {"id": finding_id, "success": True, "finding": finding} if finding
+        else {"id": finding_id, "success": False, "error": "Security finding not found"}
+        for finding_id, finding in finding_store.update_many(finding_ids, updates)
+    ]
+
+def get_version() -> Tuple[int, int, int]:
+    """
+    Version of get_security_data(): findings, keys, and the current hour,
+    since key expiry is reported relative to now
+    """
+    return finding_store.version, keys.key_store.version, int(time.time() // 3600)
 
 def get_security_data():
     """Return comprehensive security data including keys, scores, and compliance"""
     return {
-        "keys": mock_security_keys,
+        "keys": keys.get_all_keys(),
         "score": mock_security_score,
-        "compliance": mock_compliance_coverage,
+        "compliance": compliance_coverage.coverage(),
         "recommendations": mock_security_recommendations
     }
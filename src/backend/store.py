@@ -0,0 +1,326 @@
+"""
+In-memory indexed record store shared by the backend data modules
+"""
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class SortedIndex:
+    """
+    Ordered (value, id) index for range scans and keyset pagination.
+
+    Entries are kept in a sorted list maintained with bisect, so lookups are
+    O(log n) and inserts/removals are a binary search plus a memmove.
+    Records whose value is None are left out of the index.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[Any, Any]] = ()):
+        self._entries: List[Tuple[Any, Any]] = sorted(entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, value: Any, record_id: Any) -> None:
+        if value is not None:
+            bisect.insort(self._entries, (value, record_id))
+
+    def remove(self, value: Any, record_id: Any) -> None:
+        if value is None:
+            return
+        position = bisect.bisect_left(self._entries, (value, record_id))
+        if position < len(self._entries) and self._entries[position] == (value, record_id):
+            del self._entries[position]
+
+    def scan(self, after: Optional[Tuple[Any, Any]] = None, descending: bool = False) -> Iterator[Tuple[Any, Any]]:
+        """
+        Yield (value, id) entries in order, starting strictly after the given
+        (value, id) position when one is supplied
+        """
+        entries = self._entries
+        if not descending:
+            start = bisect.bisect_right(entries, after) if after is not None else 0
+            for position in range(start, len(entries)):
+                yield entries[position]
+        else:
+            start = bisect.bisect_left(entries, after) if after is not None else len(entries)
+            for position in range(start - 1, -1, -1):
+                yield entries[position]
+
+    def accepts(self, value: Any, record_id: Any = None) -> bool:
+        """
+        Whether value can be ordered against the values already indexed
+        (ignoring record_id's own entry); None is always accepted
+        """
+        if value is None:
+            return True
+        others = [entry[0] for entry in (self._entries[:1] + self._entries[-1:]) if entry[1] != record_id]
+        try:
+            for other in others or [value]:
+                value < other
+        except TypeError:
+            return False
+        return True
+
+    def range(self, low: Any = None, high: Any = None) -> Iterator[Tuple[Any, Any]]:
+        """Yield entries with low <= value <= high; None leaves a bound open"""
+        entries = self._entries
+        start = bisect.bisect_left(entries, (low,)) if low is not None else 0
+        for position in range(start, len(entries)):
+            entry = entries[position]
+            if high is not None and entry[0] > high:
+                break
+            yield entry
+
+
+class IndexedStore:
+    """
+    Dict-backed record store with a primary hash index and secondary
+    equality indexes that are kept in sync on every mutation.
+
+    Secondary index buckets are insertion-ordered dicts used as ordered sets,
+    so adding or removing an id is O(1) and filtered listings keep the
+    original record order. Fields listed in multi_indexes hold lists and are
+    indexed under each element, so a record appears in one bucket per value.
+    Values that cannot be indexed (unhashable, a multi-index value that is
+    not a list, or a sorted value that does not order against the others)
+    are rejected with ValueError before a record or index is touched.
+    Bucket sizes double as per-value counters. Fields listed in sorted_indexes
+    additionally get a SortedIndex for ordered and range access.
+
+    Listeners registered with subscribe() are called as
+    callback(action, record, previous) after every insert, update or delete,
+    while the store lock is still held, so they observe mutations in order.
+    previous is a shallow copy of the record before an update, else None.
+    version counts mutations, so callers can detect changes without
+    comparing records.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = (), key: str = "id",
+                 indexes: Iterable[str] = (), sorted_indexes: Iterable[str] = (),
+                 multi_indexes: Iterable[str] = ()):
+        self.lock = threading.RLock()
+        # Bumped on every insert, update and delete
+        self.version = 0
+        self._key = key
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        self._multi = frozenset(multi_indexes)
+        self._indexes: Dict[str, Dict[Any, Dict[Any, None]]] = {field: {} for field in (*indexes, *self._multi)}
+        self._sorted: Dict[str, SortedIndex] = {field: SortedIndex() for field in sorted_indexes}
+        self._listeners: List[Callable[[str, Dict[str, Any], Optional[Dict[str, Any]]], None]] = []
+        self.insert_many(records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, record_id: Any) -> bool:
+        return record_id in self._records
+
+    def get(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the record with the given id, or None"""
+        return self._records.get(record_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return every record in insertion order"""
+        with self.lock:
+            return list(self._records.values())
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add a record, replacing any existing record with the same id.
+        Raises ValueError if an indexed field cannot be indexed.
+        """
+        with self.lock:
+            record_id = record[self._key]
+            self._check_values(record_id, record)
+            if record_id in self._records:
+                self.delete(record_id)
+            self._records[record_id] = record
+            for field in self._indexes:
+                self._index_add(field, record.get(field), record_id)
+            for field, index in self._sorted.items():
+                index.add(record.get(field), record_id)
+            self._notify("insert", record, None)
+            return record
+
+    def insert_many(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add records in bulk. Sorted indexes are rebuilt with a single sort
+        instead of one insort per record, which keeps large loads O(n log n).
+        """
+        with self.lock:
+            sorted_indexes, self._sorted = self._sorted, {}
+            try:
+                inserted = [self.insert(record) for record in records]
+            finally:
+                self._sorted = sorted_indexes
+            for field in self._sorted:
+                self._sorted[field] = SortedIndex(
+                    (record.get(field), record_id)
+                    for record_id, record in self._records.items()
+                    if record.get(field) is not None
+                )
+            return inserted
+
+    def update(self, record_id: Any, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Apply updates to a record in place and re-index changed fields.
+        Raises ValueError, before changing anything, if the updates would
+        change the record's key or an indexed field cannot be indexed.
+        """
+        self._check_key(record_id, updates)
+        with self.lock:
+            record = self._records.get(record_id)
+            if record is None:
+                return None
+            self._check_values(record_id, updates)
+            previous = dict(record) if self._listeners else None
+            for field in self._indexes:
+                if field in updates and updates[field] != record.get(field):
+                    self._index_remove(field, record.get(field), record_id)
+                    self._index_add(field, updates[field], record_id)
+            for field, index in self._sorted.items():
+                if field in updates and updates[field] != record.get(field):
+                    index.remove(record.get(field), record_id)
+                    index.add(updates[field], record_id)
+            record.update(updates)
+            self._notify("update", record, previous)
+            return record
+
+    def update_many(self, record_ids: Iterable[Any], updates: Dict[str, Any]) -> List[Tuple[Any, Optional[Dict[str, Any]]]]:
+        """
+        Apply the same updates to several records under one lock acquisition
+
+        Returns (id, record) pairs in request order, with None for ids that
+        do not exist. Raises ValueError, before changing anything, if the
+        updates would change a key or an indexed field cannot be indexed.
+        """
+        record_ids = list(record_ids)
+        for record_id in record_ids:
+            self._check_key(record_id, updates)
+        with self.lock:
+            for record_id in record_ids:
+                if record_id in self._records:
+                    self._check_values(record_id, updates)
+            return [(record_id, self.update(record_id, updates)) for record_id in record_ids]
+
+    def delete(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Remove a record and drop it from every index"""
+        with self.lock:
+            record = self._records.pop(record_id, None)
+            if record is None:
+                return None
+            for field in self._indexes:
+                self._index_remove(field, record.get(field), record_id)
+            for field, index in self._sorted.items():
+                index.remove(record.get(field), record_id)
+            self._notify("delete", record, None)
+            return record
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any], Optional[Dict[str, Any]]], None]) -> None:
+        """Register a change listener"""
+        with self.lock:
+            self._listeners.append(callback)
+
+    def sorted_index(self, field: str) -> SortedIndex:
+        """Return the SortedIndex maintained for field"""
+        return self._sorted[field]
+
+    def find(self, **criteria: Any) -> List[Dict[str, Any]]:
+        """
+        Return records whose indexed fields equal every given value
+
+        Criteria with a None value are ignored. Only the smallest matching
+        index bucket is walked, so the cost is bounded by the most selective
+        filter rather than the size of the store.
+        """
+        with self.lock:
+            buckets = self._buckets(criteria)
+            if not buckets:
+                return list(self._records.values())
+            smallest, rest = buckets[0], buckets[1:]
+            return [
+                self._records[record_id]
+                for record_id in smallest
+                if all(record_id in bucket for bucket in rest)
+            ]
+
+    def membership(self, **criteria: Any) -> Tuple[int, Callable[[Any], bool]]:
+        """
+        Return the size of the most selective bucket for the criteria and a
+        test of whether a record id matches all of them, so callers can walk
+        another index in order and filter as they go. Criteria with a None
+        value are ignored.
+        """
+        with self.lock:
+            buckets = self._buckets(criteria)
+            if not buckets:
+                return len(self._records), lambda record_id: True
+            return len(buckets[0]), lambda record_id: all(record_id in bucket for bucket in buckets)
+
+    def count(self, field: str, value: Any) -> int:
+        """Return the number of records whose indexed field equals (or, for multi indexes, contains) value"""
+        return len(self._indexes[field].get(value, {}))
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        """Return the record count for every value of an indexed field"""
+        with self.lock:
+            return {value: len(bucket) for value, bucket in self._indexes[field].items()}
+
+    def _check_key(self, record_id: Any, updates: Dict[str, Any]) -> None:
+        if self._key in updates and updates[self._key] != record_id:
+            raise ValueError(f"'{self._key}' cannot be changed by an update")
+
+    def _check_values(self, record_id: Any, values: Dict[str, Any]) -> None:
+        """Raise ValueError if any indexed field in values cannot be indexed"""
+        for field in self._indexes:
+            if field not in values:
+                continue
+            value = values[field]
+            if field in self._multi and value is not None and not isinstance(value, (list, tuple, set, frozenset)):
+                raise ValueError(f"'{field}' must be a list")
+            for item in self._index_values(field, value):
+                try:
+                    hash(item)
+                except TypeError:
+                    raise ValueError(f"'{field}' cannot be {type(item).__name__}")
+        for field, index in self._sorted.items():
+            if field in values and not index.accepts(values[field], record_id):
+                raise ValueError(f"'{field}' cannot be {type(values[field]).__name__}")
+
+    def _buckets(self, criteria: Dict[str, Any]) -> List[Dict[Any, None]]:
+        """Index buckets for the non-None criteria, smallest first"""
+        buckets = []
+        for field, value in criteria.items():
+            if value is None:
+                continue
+            if field not in self._indexes:
+                raise KeyError(f"Field '{field}' is not indexed")
+            buckets.append(self._indexes[field].get(value, {}))
+        buckets.sort(key=len)
+        return buckets
+
+    def _notify(self, action: str, record: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+        self.version += 1
+        for callback in self._listeners:
+            callback(action, record, previous)
+
+    def _index_values(self, field: str, value: Any) -> Iterable[Any]:
+        if field in self._multi:
+            return value or ()
+        return (value,)
+
+    def _index_add(self, field: str, value: Any, record_id: Any) -> None:
+        index = self._indexes[field]
+        for item in self._index_values(field, value):
+            index.setdefault(item, {})[record_id] = None
+
+    def _index_remove(self, field: str, value: Any, record_id: Any) -> None:
+        index = self._indexes[field]
+        for item in self._index_values(field, value):
+            bucket = index.get(item)
+            if bucket is None:
+                continue
+            bucket.pop(record_id, None)
+            if not bucket:
+                del index[item]
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Keep metrics segment files out of the source tree and make the backend
+# modules importable the way main.py imports them
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="metrics-test-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+import pytest
+
+import alerts
+
+
+def test_update_normalizes_timestamps():
+    alert = alerts.update_alert("alert-1", {"timestamp": "2024-01-01T05:00:00+02:00"})
+    assert alert["timestamp"] == "2024-01-01T03:00:00Z"
+    assert ("2024-01-01T03:00:00Z", "alert-1") in alerts.alert_store.sorted_index("timestamp").scan()
+
+
+@pytest.mark.parametrize("timestamp", ["yesterday", 5, None])
+def test_update_rejects_timestamps_that_are_not_iso8601(timestamp):
+    before = dict(alerts.get_alert_by_id("alert-2"))
+    with pytest.raises(ValueError):
+        alerts.update_alert("alert-2", {"timestamp": timestamp})
+    with pytest.raises(ValueError):
+        alerts.update_alerts(["alert-2"], {"timestamp": timestamp})
+    assert alerts.get_alert_by_id("alert-2") == before
+
+
+def test_ingest_rejects_bad_lines_and_keeps_the_rest():
+    before = len(alerts.alert_store)
+    result = alerts.ingest_alerts([
+        {"title": "Disk full", "source": "Ingest test", "affected_resources": ["vol-1"]},
+        "not an object",
+        {"title": "Missing source"},
+        {"title": "Bad time", "source": "Ingest test", "timestamp": 1700000000},
+        {"title": "Bad count", "source": "Ingest test", "count": "many"},
+        {"title": "Bad severity", "source": "Ingest test", "severity": ["x"]},
+        {"title": "Bad resources", "source": "Ingest test", "affected_resources": 5},
+        {"title": "String resources", "source": "Ingest test", "affected_resources": "vol-1"},
+        {"title": "Disk full", "source": "Ingest test", "affected_resources": ["vol-1"], "count": 2},
+    ])
+    assert [r["index"] for r in result["rejected"]] == [1, 2, 3, 4, 5, 6, 7]
+    assert len(result["created"]) == 1
+    assert len(alerts.alert_store) == before + 1
+    assert alerts.get_alert_by_id(result["created"][0])["count"] == 3
+
+
+def test_ingest_coalesces_into_the_active_alert():
+    first = alerts.ingest_alerts([{"title": "CPU high", "source": "Coalesce test",
+                                   "timestamp": "2024-01-01T00:00:00Z"}])
+    second = alerts.ingest_alerts([{"title": "CPU high", "source": "Coalesce test",
+                                    "timestamp": "2024-01-02T00:00:00Z", "severity": "Critical"}])
+    assert second["coalesced"] == first["created"]
+    alert = alerts.get_alert_by_id(first["created"][0])
+    assert (alert["count"], alert["first_seen"], alert["last_seen"], alert["severity"]) == \
+        (2, "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z", "Critical")
@@ -0,0 +1,36 @@
+import math
+
+import pytest
+
+import analytics
+import resources
+from store import IndexedStore
+
+
+def test_non_numeric_resource_fields_are_rejected_before_the_store_changes():
+    version = analytics.resource_columns.version
+    resource = dict(resources.resource_store.get("i-0123456789"))
+    with pytest.raises(ValueError):
+        resources.update_resource("i-0123456789", {"monthly_cost": "a lot"})
+    assert resources.resource_store.get("i-0123456789") == resource
+    assert analytics.resource_columns.version == version
+
+
+def test_columns_coerce_values_that_are_not_numbers():
+    store = IndexedStore([{"id": "r1", "type": "EC2", "monthly_cost": "n/a", "utilization": "high"}])
+    columns = analytics.ResourceColumns(store)
+    store.insert({"id": "r2", "type": "EC2", "monthly_cost": 10, "utilization": None})
+    _, cost, utilization, _, _ = columns.snapshot()
+    assert cost.tolist() == [0.0, 10.0]
+    assert all(math.isnan(value) for value in utilization.tolist())
+
+
+def test_columns_track_updates_and_deletes():
+    store = IndexedStore([{"id": f"r{i}", "type": "EC2", "monthly_cost": i, "utilization": 10.0 * i} for i in range(4)])
+    columns = analytics.ResourceColumns(store, initial_capacity=2)
+    store.update("r1", {"monthly_cost": 100})
+    store.delete("r2")
+    store.insert({"id": "r9", "type": "RDS", "monthly_cost": 7, "utilization": 1.0})
+    _, cost, _, codes, labels = columns.snapshot("type")
+    assert sorted(cost.tolist()) == [0.0, 3.0, 7.0, 100.0]
+    assert sorted(labels[code] for code in codes.tolist()) == ["EC2", "EC2", "EC2", "RDS"]
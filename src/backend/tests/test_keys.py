@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+import keys
+from store import IndexedStore
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def make_scanner(*key_days):
+    store = IndexedStore(
+        [{"id": f"key-{i}", "name": f"Key {i}", "expiresAt": keys._timestamp(NOW + timedelta(days=days))}
+         for i, days in enumerate(key_days)],
+        sorted_indexes=("expiresAt",)
+    )
+    raised = []
+    scanner = keys.KeyExpiryScanner(store, thresholds=(30, 7, 1, 0), raise_alerts=raised.extend)
+    return store, scanner, raised
+
+
+def titles(alerts):
+    return sorted((alert["affected_resources"][0], alert["title"]) for alert in alerts)
+
+
+def test_alerts_once_per_key_per_threshold():
+    store, scanner, raised = make_scanner(20, 60)
+    assert titles(scanner.scan(NOW)) == [("key-0", "Security key expires within 30 days")]
+    assert scanner.scan(NOW) == []
+    assert scanner.scan(NOW + timedelta(days=1)) == []
+    assert titles(scanner.scan(NOW + timedelta(days=14))) == [("key-0", "Security key expires within 7 days")]
+    assert titles(scanner.scan(NOW + timedelta(days=40))) == [
+        ("key-0", "Security key expired"),
+        ("key-1", "Security key expires within 30 days"),
+    ]
+    assert len(raised) == 4
+
+
+def test_rewriting_the_same_expiry_does_not_realert():
+    store, scanner, raised = make_scanner(20)
+    scanner.scan(NOW)
+    store.update("key-0", {"name": "Renamed", "expiresAt": store.get("key-0")["expiresAt"]})
+    assert scanner.scan(NOW) == []
+
+
+def test_rotated_key_alerts_again():
+    store, scanner, raised = make_scanner(20)
+    scanner.scan(NOW)
+    store.update("key-0", {"expiresAt": keys._timestamp(NOW + timedelta(days=25))})
+    assert titles(scanner.scan(NOW)) == [("key-0", "Security key expires within 30 days")]
+
+
+def test_upsert_of_an_unchanged_key_keeps_alert_history():
+    keys.key_scanner.scan()
+    key = keys.key_store.get("key-1")
+    raised = keys.key_scanner.scan()
+    keys.upsert_key({"id": "key-1", "name": key["name"], "expiresAt": key["expiresAt"]})
+    assert raised == [] and keys.key_scanner.scan() == []
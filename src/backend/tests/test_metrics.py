@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+import pytest
+
+import metrics
+
+DAY = 86400
+
+
+@pytest.fixture
+def store(tmp_path):
+    return metrics.MetricsStore(str(tmp_path), series_per_segment=64)
+
+
+def minute(seconds):
+    return seconds // 60 * 60
+
+
+def test_raw_samples_and_rollups(store):
+    hour = int(time.time() // 3600 * 3600) - 2 * 3600
+    times = hour + np.arange(60) * 60
+    assert store.ingest("cpu", ["r1"] * 60, times, np.full(60, 40.0)) == 60
+    # Rewriting minutes replaces their contribution to the hourly mean and raises its peak
+    store.ingest("cpu", ["r1"] * 30, times[:30], np.full(30, 80.0))
+    _, raw = store.window("cpu", ["r1"], times[0], times[-1])
+    assert raw[0].tolist() == [80.0] * 30 + [40.0] * 30
+    _, hourly = store.window("cpu", ["r1"], hour, hour, "1h")
+    _, peaks = store.window("cpu", ["r1"], hour, hour, "1h", field="max")
+    assert hourly[0].tolist() == [60.0] and peaks[0].tolist() == [80.0]
+
+
+def test_skips_samples_outside_retention_and_clock_skew(store):
+    now = time.time()
+    stored = store.ingest("cpu", ["old", "future", "nan", "ok"],
+                          [now - 400 * DAY, now + 3600, now, now], [1.0, 2.0, float("nan"), 3.0])
+    assert stored == 1
+    assert "ok" in store and "old" not in store and "future" not in store and "nan" not in store
+
+
+def test_ring_buffer_laps_over_the_oldest_minutes(store):
+    slots = metrics.TIERS["1m"][1] * 1440
+    now = minute(time.time())
+    oldest = now - (slots - 2) * 60
+    store.ingest("cpu", ["r1"] * 2, [oldest, oldest + 60], [10.0, 11.0])
+    # Two minutes ahead, the newest sample reuses the oldest minute's slot
+    store.ingest("cpu", ["r1"], now + 120, [20.0])
+    times, raw = store.window("cpu", ["r1"], oldest, now + 120)
+    values = dict(zip(times.tolist(), raw[0].tolist()))
+    assert oldest not in values
+    assert values[oldest + 60] == 11.0 and values[now + 120] == 20.0
+    assert np.nansum(raw) == 31.0
+
+
+def test_segments_grow_and_reopen(tmp_path):
+    store = metrics.MetricsStore(str(tmp_path), series_per_segment=64)
+    now = time.time()
+    ids = [f"r{i}" for i in range(70)]
+    store.ingest("memory", ids[:10], now, np.arange(10, dtype=float))
+    assert store._segments[0].capacity == metrics.MIN_SEGMENT_SERIES
+    store.ingest("memory", ids[10:], now, np.arange(10, 70, dtype=float))
+    assert [segment.capacity for segment in store._segments] == [64, metrics.MIN_SEGMENT_SERIES]
+    store.flush()
+
+    reopened = metrics.MetricsStore(str(tmp_path), series_per_segment=64)
+    assert [segment.capacity for segment in reopened._segments] == [64, metrics.MIN_SEGMENT_SERIES]
+    _, values = reopened.window("memory", ids, now - 60, now)
+    assert np.nanmax(values, axis=1).tolist() == list(range(70))
+
+
+def test_small_fleets_allocate_small_segments(tmp_path):
+    store = metrics.MetricsStore(str(tmp_path))
+    store.ingest("cpu", ["a", "b", "c"], time.time(), [1.0, 2.0, 3.0])
+    assert store._segments[0].capacity == metrics.MIN_SEGMENT_SERIES
+    allocated = sum(path.stat().st_size for path in tmp_path.iterdir())
+    assert allocated < 4 * 1024 * 1024
+
+
+def test_ingest_metrics_rejects_out_of_range_timestamps():
+    with pytest.raises(ValueError):
+        metrics.ingest_metrics("cpu", time.time() + DAY, {"r1": 1.0})
+    with pytest.raises(ValueError):
+        metrics.ingest_metrics("cpu", time.time() - 400 * DAY, {"r1": 1.0})
@@ -0,0 +1,42 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+import optimization
+import scenarios
+
+client = TestClient(main.app)
+
+
+def projection(data):
+    return {field: data[field] for field in ("monthly", "yearly", "co2_reduction", "risk", "optimization_score")}
+
+
+def test_optimization_and_scenarios_agree_on_the_current_config():
+    current = client.get("/optimization/scenarios").json()["current"]
+    assert projection(client.get("/optimization").json()["projections"]) == projection(current)
+    assert current["config"] == {field: optimization.mock_optimization_config[field] for field in current["config"]}
+
+
+def test_config_update_reprojects_with_the_same_model():
+    original = dict(optimization.mock_optimization_config)
+    try:
+        config = {"right_sizing_level": 30, "scheduling_enabled": True}
+        projections = client.post("/optimization/config", json=config).json()["projections"]
+        assert projection(projections) == projection(client.get("/optimization/scenarios", params={"step": 5}).json()["current"])
+        assert projections == optimization.calculate_savings(optimization.mock_optimization_config)
+    finally:
+        optimization.update_optimization_config(original)
+
+
+def test_every_lever_on_scores_the_maximum():
+    everything = {"idle_resources_enabled": True, "right_sizing_level": 100, "auto_scaling_level": 100,
+                  "scheduling_enabled": True, "storage_optimization_enabled": True}
+    assert scenarios.project_config(everything)["optimization_score"] == scenarios.MAX_OPTIMIZATION_SCORE
+
+
+def test_pareto_frontier_drops_dominated_and_duplicate_points():
+    savings = np.array([10.0, 5.0, 10.0, 8.0, 10.0])
+    co2 = np.array([1.0, 0.5, 1.0, 2.0, 0.5])
+    risk = np.array([3.0, 1.0, 3.0, 4.0, 3.0])
+    assert np.flatnonzero(scenarios.pareto_frontier(savings, co2, risk)).tolist() == [0, 1, 3]
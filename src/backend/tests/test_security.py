@@ -0,0 +1,25 @@
+import pytest
+
+import security
+
+
+@pytest.mark.parametrize("compliance", ["GDPR", ["GDPR", "Made Up"], [["GDPR"]], None])
+def test_update_rejects_invalid_compliance(compliance):
+    coverage = security.compliance_coverage.coverage()
+    with pytest.raises(ValueError):
+        security.update_finding("sec-1", {"compliance": compliance})
+    with pytest.raises(ValueError):
+        security.update_findings(["sec-1"], {"compliance": compliance})
+    assert security.compliance_coverage.coverage() == coverage
+
+
+def test_coverage_follows_status_and_compliance_changes():
+    finding = security.get_finding_by_id("sec-1")
+    original = {"status": finding["status"], "compliance": list(finding["compliance"])}
+    try:
+        security.update_finding("sec-1", {"compliance": ["HIPAA"], "status": "Fixed"})
+        rebuilt = security.ComplianceCoverage(security.finding_store).coverage()
+        assert security.compliance_coverage.coverage() == rebuilt
+        assert set(rebuilt) == set(security.FRAMEWORK_KEYS.values())
+    finally:
+        security.update_finding("sec-1", original)
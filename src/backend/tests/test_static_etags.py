@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+import leaderboard
+import main
+
+client = TestClient(main.app)
+
+
+def test_static_etag_follows_payload(monkeypatch):
+    first = client.get("/leaderboard")
+    etag = first.headers["ETag"]
+    assert client.get("/leaderboard", headers={"If-None-Match": etag}).status_code == 304
+
+    entries = [dict(entry) for entry in leaderboard.mock_leaderboard_entries]
+    entries[0]["savings"] += 1
+    monkeypatch.setattr(leaderboard, "mock_leaderboard_entries", entries)
+    changed = client.get("/leaderboard", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_incident_etag_is_stable():
+    etag = client.get("/incident/data").headers["ETag"]
+    assert client.get("/incident/data", headers={"If-None-Match": etag}).status_code == 304
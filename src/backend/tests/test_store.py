@@ -0,0 +1,93 @@
+import pytest
+
+from store import IndexedStore
+
+
+def make_store():
+    return IndexedStore(
+        [
+            {"id": "a", "severity": "Critical", "timestamp": "2024-01-01T00:00:00Z", "tags": ["x", "y"]},
+            {"id": "b", "severity": "Warning", "timestamp": "2024-01-02T00:00:00Z", "tags": ["y"]},
+            {"id": "c", "severity": "Warning", "timestamp": "2024-01-03T00:00:00Z", "tags": []},
+        ],
+        indexes=("severity",),
+        sorted_indexes=("timestamp",),
+        multi_indexes=("tags",)
+    )
+
+
+def assert_consistent(store):
+    """Every index agrees with a rebuild from the records themselves"""
+    records = store.all()
+    expected_counts = {}
+    for record in records:
+        expected_counts[record["severity"]] = expected_counts.get(record["severity"], 0) + 1
+    assert store.counts("severity") == expected_counts
+    expected_tags = {}
+    for record in records:
+        for tag in record["tags"]:
+            expected_tags[tag] = expected_tags.get(tag, 0) + 1
+    assert store.counts("tags") == expected_tags
+    assert list(store.sorted_index("timestamp").scan()) == sorted((r["timestamp"], r["id"]) for r in records)
+
+
+def test_update_reindexes_changed_fields():
+    store = make_store()
+    store.update("b", {"severity": "Critical", "timestamp": "2023-12-31T00:00:00Z", "tags": ["z"]})
+    assert [r["id"] for r in store.find(severity="Critical")] == ["a", "b"]
+    assert [r["id"] for r in store.find(tags="z")] == ["b"]
+    assert next(store.sorted_index("timestamp").scan())[1] == "b"
+    assert_consistent(store)
+
+
+@pytest.mark.parametrize("updates", [
+    {"timestamp": 5},
+    {"timestamp": {"at": "now"}},
+    {"severity": ["x"]},
+    {"tags": "GDPR"},
+    {"tags": [["nested"]]},
+    {"id": "other"},
+])
+def test_invalid_update_changes_nothing(updates):
+    store = make_store()
+    version = store.version
+    before = [dict(r) for r in store.all()]
+    with pytest.raises(ValueError):
+        store.update("b", updates)
+    with pytest.raises(ValueError):
+        store.update_many(["a", "b"], updates)
+    assert store.all() == before
+    assert store.version == version
+    assert_consistent(store)
+
+
+def test_invalid_insert_keeps_the_existing_record():
+    store = make_store()
+    with pytest.raises(ValueError):
+        store.insert({"id": "a", "severity": "Info", "timestamp": 5, "tags": []})
+    assert store.get("a")["severity"] == "Critical"
+    assert_consistent(store)
+
+
+def test_delete_and_reinsert_keep_indexes_in_sync():
+    store = make_store()
+    store.delete("a")
+    store.insert({"id": "d", "severity": "Info", "timestamp": "2024-01-04T00:00:00Z", "tags": ["x"]})
+    assert_consistent(store)
+    assert store.count("tags", "x") == 1
+
+
+def test_membership_matches_find():
+    store = make_store()
+    size, matches = store.membership(severity="Warning", tags="y")
+    assert size == 2
+    assert [r["id"] for r in store.all() if matches(r["id"])] == [r["id"] for r in store.find(severity="Warning", tags="y")]
+
+
+def test_listeners_see_previous_values():
+    store = make_store()
+    changes = []
+    store.subscribe(lambda action, record, previous: changes.append((action, record["id"], previous and previous["severity"])))
+    store.update("a", {"severity": "Info"})
+    store.delete("c")
+    assert changes == [("update", "a", "Critical"), ("delete", "c", None)]